@@ -0,0 +1,144 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from utils import card_rank
+from checkpoint import save_strategy, load_strategy
+
+NUM_FEATURES = 8
+ACTIONS = ("fold", "call", "raise")
+
+def encode_decision(evaluator, seat, playing, bets, pot, chip_stack):
+    """fixed-length feature vector for one decision, every feature roughly in [0, 1]"""
+    to_call = bets.max() - bets[seat]
+    in_pot = pot + bets.sum()
+    return np.array([
+        evaluator.hand_type() / 8,
+        max(card_rank(card) for card in evaluator.cards) / 12,
+        evaluator.flush_draw() >= 0,
+        len(evaluator.straight_draw()) / 2,
+        max(evaluator.num_board_cards - 2, 0) / 3,
+        to_call / (in_pot + to_call) if in_pot + to_call > 0 else 0,
+        in_pot / (in_pot + chip_stack) if in_pot + chip_stack > 0 else 1,
+        playing.sum() / len(playing),
+    ], dtype=float)
+
+
+class Policy(ABC):
+    """maps a (batch, NUM_FEATURES) feature matrix to (batch, len(ACTIONS)) action probabilities"""
+    @abstractmethod
+    def __call__(self, features):
+        pass
+
+    def decide(self, features):
+        """unbatched decision, for tables played on their own"""
+        return self(features[None])[0]
+
+
+class MLPPolicy(Policy):
+    def __init__(self, weights, biases):
+        self.weights = weights
+        self.biases = biases
+
+    @classmethod
+    def random(cls, hidden=(32,), seed=None):
+        rng = np.random.default_rng(seed)
+        sizes = (NUM_FEATURES,) + tuple(hidden) + (len(ACTIONS),)
+        weights = [rng.normal(scale=1/np.sqrt(n_in), size=(n_in, n_out)) for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+        biases = [np.zeros(n_out) for n_out in sizes[1:]]
+        return cls(weights, biases)
+
+    def __call__(self, features):
+        x = features
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.maximum(x @ weight + bias, 0)
+        logits = x @ self.weights[-1] + self.biases[-1]
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+class TablePolicy(Policy):
+    """
+    tabular policy over a coarse bucketing of the features: hand type, street and pot odds
+    probs - (9, 4, num_odds_buckets, len(ACTIONS)) array of action probabilities
+    """
+    def __init__(self, probs):
+        self.probs = probs
+
+    def __call__(self, features):
+        return self.probs[tuple(buckets(features, self.probs.shape[2]).T)]
+
+    def save(self, path, dtype="float16"):
+        """writes the table as a strategy checkpoint, one info set per bucket, for CheckpointPolicy to load"""
+        strategies = {infoset_key(bucket): self.probs[bucket] for bucket in np.ndindex(self.probs.shape[:-1])}
+        save_strategy(path, strategies, dtype, metadata={"num_odds_buckets": self.probs.shape[2]})
+
+
+def buckets(features, num_odds_buckets):
+    """(batch, 3) hand type, street and pot odds bucket of each feature row"""
+    hand_types = np.rint(features[:, 0] * 8).astype(int)
+    streets = np.rint(features[:, 4] * 3).astype(int)
+    odds = np.minimum((features[:, 5] * num_odds_buckets).astype(int), num_odds_buckets - 1)
+    return np.stack([hand_types, streets, odds], axis=1)
+
+def infoset_key(bucket):
+    return "{}:{}:{}".format(*bucket)
+
+
+class CheckpointPolicy(Policy):
+    """
+    TablePolicy read from a strategy checkpoint through np.memmap, so players in every process share one
+    copy of the strategy and start without loading it; info sets missing from the checkpoint play uniformly
+    """
+    def __init__(self, path):
+        self.checkpoint = load_strategy(path)
+        if "num_odds_buckets" not in self.checkpoint.metadata:
+            raise ValueError("{} was not saved from a TablePolicy, it has no odds bucketing".format(path))
+        self.num_odds_buckets = self.checkpoint.metadata["num_odds_buckets"]
+
+    def __call__(self, features):
+        return self.checkpoint.get_many([infoset_key(bucket) for bucket in buckets(features, self.num_odds_buckets)])
+
+
+def play_tables(tables, hands, little_blind, big_blind, max_batch_size=64):
+    """
+    plays the same number of hands at every table in one thread, stepping the tables together: every table
+    is run up to its next policy decision, then each policy is called on all the decisions waiting on it,
+    in chunks of at most max_batch_size (bounding the memory and latency of one call to a wide policy);
+    there is no wait time to tune, every table is already blocked on its decision when the batch is sent,
+    so waiting longer could not add to it
+    batching pays off when a policy call costs much more per call than per row (e.g. a wide MLPPolicy),
+    for a cheap policy it roughly matches playing the tables one by one
+    returns the size of every batch
+    """
+    def table_steps(table):
+        for _ in range(hands):
+            yield from table.play_hand_steps(little_blind, big_blind)
+            for name, chip_stack in zip(list(table.names), table.chip_stacks):
+                if chip_stack == 0:
+                    table.remove_player(name)
+            if table.num_players == 1:
+                break
+
+    pending = {}
+    def advance(steps, probs):
+        try:
+            pending[steps] = steps.send(probs)
+        except StopIteration:
+            pass
+
+    for table in tables:
+        advance(table_steps(table), None)
+    batch_sizes = []
+    while pending:
+        batches = {}
+        for steps, (policy, features) in pending.items():
+            batches.setdefault(policy, []).append((steps, features))
+        pending.clear()
+        for policy, decisions in batches.items():
+            for start in range(0, len(decisions), max_batch_size):
+                batch = decisions[start:start + max_batch_size]
+                probs = policy(np.stack([features for _, features in batch]))
+                batch_sizes.append(len(batch))
+                for (steps, _), row in zip(batch, probs):
+                    advance(steps, row)
+    return batch_sizes
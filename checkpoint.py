@@ -0,0 +1,136 @@
+import os
+import json
+import struct
+import hashlib
+import tempfile
+import numpy as np
+
+MAGIC = b"PKRSTRAT"
+VERSION = 1
+# magic, version, dtype code, number of info sets, number of actions, metadata length, index offset, data offset;
+# the metadata (a json object) follows the header
+HEADER = struct.Struct("<8sIIQIQQQ")
+ALIGNMENT = 64
+DTYPES = {"float16": (0, np.float16), "uint8": (1, np.uint8)}
+DTYPE_NAMES = {code: name for name, (code, _) in DTYPES.items()}
+
+def infoset_hash(key):
+    """stable 64-bit hash of an info set key (a string), as stored in the checkpoint index"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_strategy(path, strategies, dtype="float16", metadata=None):
+    """
+    writes a dict of info set key to action probabilities (all the same length) as a checkpoint:
+    a header, json metadata (whatever a reader needs to build its keys), the sorted uint64 hashes of the keys,
+    then one row of probabilities per key, either as float16 or quantized to uint8 (probability * 255);
+    the file is written next to path and moved over it, so readers never see a partial checkpoint
+    """
+    if dtype not in DTYPES:
+        raise ValueError("invalid dtype {}, must be one of {}".format(dtype, ", ".join(DTYPES)))
+    if len(strategies) == 0:
+        raise ValueError("no info sets to save")
+    keys = list(strategies)
+    hashes = np.array([infoset_hash(key) for key in keys], dtype=np.uint64)
+    if len(np.unique(hashes)) != len(hashes):
+        raise ValueError("info set keys collide in the checkpoint index, rename them")
+    order = np.argsort(hashes)
+    probs = np.array([strategies[keys[i]] for i in order], dtype=float).reshape(len(keys), -1)
+
+    dtype_code = DTYPES[dtype][0]
+    data = probs.astype(np.float16) if dtype == "float16" else np.rint(np.clip(probs, 0, 1) * 255).astype(np.uint8)
+    metadata = json.dumps({} if metadata is None else metadata).encode()
+    index_offset = align(HEADER.size + len(metadata))
+    data_offset = align(index_offset + hashes.nbytes)
+    header = HEADER.pack(MAGIC, VERSION, dtype_code, len(keys), probs.shape[1], len(metadata), index_offset, data_offset)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as fh:
+        try:
+            fh.write(header)
+            fh.write(metadata)
+            fh.seek(index_offset)
+            fh.write(hashes[order].tobytes())
+            fh.seek(data_offset)
+            fh.write(data.tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+            # temporary files are private, publish with the mode a plain open() would have given
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(fh.name, 0o666 & ~umask)
+        except BaseException:
+            os.unlink(fh.name)
+            raise
+    os.replace(fh.name, path)
+    # the rename is only durable once the directory entry is on disk
+    directory_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+class StrategyCheckpoint:
+    """
+    read-only view of a checkpoint through np.memmap: opening one reads only the header, and every process
+    opening the same file shares one page-cached copy of the index and strategies
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fh:
+            magic, version, dtype_code, num_infosets, num_actions, metadata_length, index_offset, data_offset = HEADER.unpack(fh.read(HEADER.size))
+            metadata = fh.read(metadata_length)
+        if magic != MAGIC:
+            raise ValueError("{} is not a strategy checkpoint".format(path))
+        if version > VERSION:
+            raise ValueError("checkpoint {} has version {}, only up to {} is supported".format(path, version, VERSION))
+        self.version = version
+        self.dtype = DTYPE_NAMES[dtype_code]
+        self.num_actions = num_actions
+        self.metadata = json.loads(metadata)
+        self.index = np.memmap(path, dtype=np.uint64, mode="r", offset=index_offset, shape=(num_infosets,))
+        self.data = np.memmap(path, dtype=DTYPES[self.dtype][1], mode="r", offset=data_offset, shape=(num_infosets, num_actions))
+
+    def __len__(self):
+        return len(self.index)
+
+    def rows(self, keys):
+        """row of each key in the checkpoint, -1 for keys it doesn't have"""
+        hashes = np.array([infoset_hash(key) for key in keys], dtype=np.uint64)
+        rows = np.searchsorted(self.index, hashes)
+        found = rows < len(self.index)
+        found[found] = self.index[rows[found]] == hashes[found]
+        return np.where(found, rows, -1)
+
+    def __contains__(self, key):
+        return self.rows([key])[0] >= 0
+
+    def get_many(self, keys, default=None):
+        """(len(keys), num_actions) action probabilities, keys missing from the checkpoint get default (uniform if None)"""
+        rows = self.rows(keys)
+        probs = np.full((len(keys), self.num_actions), 1 / self.num_actions)
+        if default is not None:
+            probs[:] = default
+        found = rows >= 0
+        probs[found] = self.data[rows[found]]
+        if self.dtype == "uint8":
+            probs[found] /= 255
+        totals = probs.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, probs / np.where(totals > 0, totals, 1), 1 / self.num_actions)
+
+    def get(self, key, default=None):
+        return self.get_many([key], default)[0]
+
+
+CHECKPOINTS = {}
+
+def load_strategy(path):
+    """opens a checkpoint once per process (reopened if the file was replaced), shared by every player loading it"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_ino, stat.st_mtime_ns)
+    if key not in CHECKPOINTS:
+        CHECKPOINTS[key] = StrategyCheckpoint(path)
+    return CHECKPOINTS[key]
@@ -0,0 +1,160 @@
+import numpy as np
+from collections import OrderedDict
+from itertools import combinations
+from utils import all_combos, card_rank, strength_from_counts
+
+COMBOS = all_combos()
+# COMBO_CARDS[c, k] is True if combo c holds card k
+COMBO_CARDS = np.zeros((len(COMBOS), 52), dtype=bool)
+COMBO_CARDS[np.arange(len(COMBOS)), COMBOS[:, 0]] = True
+COMBO_CARDS[np.arange(len(COMBOS)), COMBOS[:, 1]] = True
+
+def combo_index(card1, card2):
+    """index of a hole card combo (0-51 ints, either order) into all_combos()"""
+    low, high = min(card1, card2), max(card1, card2)
+    return low * 51 - low * (low - 1) // 2 + high - low - 1
+
+def range_from_combos(combos, weights=None):
+    """weight vector over all 1326 combos with the given combos set to their weights (default 1)"""
+    weights = np.ones(len(combos)) if weights is None else weights
+    hand_range = np.zeros(len(COMBOS))
+    for (card1, card2), weight in zip(combos, weights):
+        hand_range[combo_index(card1, card2)] = weight
+    return hand_range
+
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class EquityResult:
+    """
+    equity - per-combo equity of each hero combo against the villain range (0 where the combo can't be held)
+    range_equity - equity of the whole hero range against the whole villain range
+    """
+    def __init__(self, equity, matchups, hero_range):
+        self.equity = equity
+        self.matchups = matchups
+        total = (hero_range * matchups).sum()
+        self.range_equity = (hero_range * matchups * equity).sum() / total if total > 0 else 0.
+
+
+class EquityEngine:
+    """
+    range-vs-range equity over all 1326 hole card combos: each river board is evaluated once per combo,
+    combos are sorted by strength, and wins/ties are read off cumulative weights with per-card blocker
+    corrections, so a whole range costs O(n log n) instead of one comparison per pair of combos
+    """
+    def __init__(self, cache_size=256, max_runouts=50, seed=0):
+        self.max_runouts = max_runouts
+        self.seed = seed
+        self.strengths_cache = LRUCache(cache_size)
+        self.equity_cache = LRUCache(cache_size)
+
+    def combo_strengths(self, board):
+        """strength of every combo on a five-card board, -1 for combos that share a card with it"""
+        key = tuple(sorted(board))
+        strengths = self.strengths_cache.get(key)
+        if strengths is not None:
+            return strengths
+
+        rank_counts = [0] * 13
+        suit_masks = [0] * 4
+        for card in board:
+            rank_counts[card_rank(card)] += 1
+            suit_masks[card // 13] |= 1 << card_rank(card)
+
+        strengths = np.full(len(COMBOS), -1, dtype=np.int64)
+        for c, combo in enumerate(COMBOS.tolist()):
+            if combo[0] in key or combo[1] in key:
+                continue
+            counts = rank_counts.copy()
+            masks = suit_masks.copy()
+            for card in combo:
+                counts[card_rank(card)] += 1
+                masks[card // 13] |= 1 << card_rank(card)
+            strengths[c] = strength_from_counts(counts, masks)
+        self.strengths_cache.put(key, strengths)
+        return strengths
+
+    def showdown_counts(self, strengths, villain_range):
+        """
+        for every combo, villain weight it beats, ties and faces on a river whose combo strengths are given;
+        combos sharing a card with the hero combo are removed through per-card cumulative weights
+        """
+        villain_range = villain_range * (strengths >= 0)
+        order = np.argsort(strengths, kind="stable")
+        sorted_strengths = strengths[order]
+        sorted_weights = villain_range[order]
+
+        cum_total = np.concatenate([[0.], np.cumsum(sorted_weights)])
+        cum_cards = np.vstack([np.zeros(52), np.cumsum(sorted_weights[:, None] * COMBO_CARDS[order], axis=0)])
+        first = np.searchsorted(sorted_strengths, sorted_strengths, side="left")
+        last = np.searchsorted(sorted_strengths, sorted_strengths, side="right")
+
+        cards = COMBOS[order]
+        def blocked(cum, index):
+            return cum[index, cards[:, 0]] + cum[index, cards[:, 1]]
+
+        below = cum_total[first] - blocked(cum_cards, first)
+        equal = (cum_total[last] - cum_total[first]) - (blocked(cum_cards, last) - blocked(cum_cards, first)) + sorted_weights
+        total = cum_total[-1] - (cum_cards[-1, cards[:, 0]] + cum_cards[-1, cards[:, 1]]) + sorted_weights
+
+        wins, ties, matchups = np.zeros(len(order)), np.zeros(len(order)), np.zeros(len(order))
+        wins[order], ties[order], matchups[order] = below, equal, total
+        live = strengths >= 0
+        return wins * live, ties * live, matchups * live
+
+    def runouts(self, board):
+        missing = 5 - len(board)
+        deck = [card for card in range(52) if card not in board]
+        num_runouts = 1
+        for i in range(missing):
+            num_runouts = num_runouts * (len(deck) - i) // (i + 1)
+        if num_runouts <= self.max_runouts:
+            return [list(board) + list(cards) for cards in combinations(deck, missing)]
+        rng = np.random.default_rng(self.seed)
+        return [list(board) + rng.choice(deck, size=missing, replace=False).tolist() for _ in range(self.max_runouts)]
+
+    def range_key(self, hand_range):
+        return hash(np.ascontiguousarray(hand_range, dtype=float).tobytes())
+
+    def equity(self, board, hero_range, villain_range):
+        """
+        equity of hero_range against villain_range (weight vectors over all_combos()) on a 0-5 card board;
+        boards with cards to come average over every runout, or a fixed sample of max_runouts of them
+        """
+        key = (tuple(sorted(board)), self.range_key(hero_range), self.range_key(villain_range))
+        result = self.equity_cache.get(key)
+        if result is not None:
+            return result
+
+        wins, ties, matchups = np.zeros(len(COMBOS)), np.zeros(len(COMBOS)), np.zeros(len(COMBOS))
+        for runout in self.runouts(list(board)):
+            runout_wins, runout_ties, runout_matchups = self.showdown_counts(self.combo_strengths(runout), villain_range)
+            wins += runout_wins
+            ties += runout_ties
+            matchups += runout_matchups
+
+        equity = np.where(matchups > 0, (wins + 0.5 * ties) / np.where(matchups > 0, matchups, 1), 0)
+        result = EquityResult(equity, matchups, hero_range)
+        self.equity_cache.put(key, result)
+        return result
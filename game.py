@@ -1,14 +1,68 @@
 import numpy as np
-from os import listdir
 import sys
-from utils import rotate_list, smart_open, Hand, HandState, parse_argv
+import math
+import itertools
+import functools
+import multiprocessing
+from utils import rotate_list, smart_open, HandEvaluator, HandState, parse_argv, card_to_int, hand_strength
 from player import Caller, SmallRaiser
+from stats import MatchStatistics
+from registry import get_registry, init_worker
+
+def split_pot(shares, hand_ranks):
+    """
+    pays every side pot to the best hand among the players who contributed up to its level, splitting ties;
+    hand_ranks are 0 for players who folded, so chips they put in above everyone else go to the best remaining hand
+    """
+    payouts = np.zeros(len(shares))
+    prev_level = 0
+    for level in np.unique(shares[shares > 0]):
+        side_pot = (np.minimum(shares, level) - np.minimum(shares, prev_level)).sum()
+        eligible = (shares >= level) & (hand_ranks > 0)
+        if not eligible.any():
+            eligible = hand_ranks > 0
+        winners = eligible & (hand_ranks == hand_ranks[eligible].max())
+        payouts[winners] += side_pot / winners.sum()
+        prev_level = level
+    return payouts
+
+def run_steps(steps):
+    """
+    drives a table generator (see Table.play_hand_steps) on its own, answering each (policy, features)
+    request with policy.decide(features); returns what the generator returns
+    """
+    try:
+        request = next(steps)
+        while True:
+            policy, features = request
+            request = steps.send(policy.decide(features))
+    except StopIteration as stop:
+        return stop.value
+
+@functools.lru_cache(maxsize=4096)
+def all_in_runout_strengths(hands, board, max_runouts=1000):
+    """
+    (num_runouts, num_hands) strengths of each hand on every runout of the board, memoized per (hands, board);
+    every runout is enumerated when that takes at most max_runouts, otherwise a fixed sample of them is used
+    """
+    dead = set(board).union(*hands)
+    deck = [card for card in range(52) if card not in dead]
+    missing = 5 - len(board)
+    if math.comb(len(deck), missing) <= max_runouts:
+        runouts = [list(cards) for cards in itertools.combinations(deck, missing)]
+    else:
+        rng = np.random.default_rng(0)
+        runouts = [rng.choice(deck, size=missing, replace=False).tolist() for _ in range(max_runouts)]
+    return np.array([[hand_strength(list(board) + runout + list(hand)) for hand in hands] for runout in runouts])
 
 class Dealer:
-    def __init__(self, num_players):
+    def __init__(self, num_players, seed=None):
         self.num_players = num_players
+        # a seeded dealer draws the same cards in the same order every time, so deals can be replayed
+        self.rng = np.random if seed is None else np.random.default_rng(seed)
         self.hole_cards = np.array(['..', '..'] * num_players, dtype=object)
         self.community_cards = []
+        self.evaluators = [None] * num_players
         self.available_cards = np.arange(52)
 
         self.faces = {num : str(num+1) for num in range(1,9)}
@@ -22,83 +76,51 @@ class Dealer:
         return name
 
     def draw_cards(self, num_cards):
-        cards = np.random.choice(self.available_cards, size=num_cards, replace=False)
+        cards = self.rng.choice(self.available_cards, size=num_cards, replace=False)
         for card in cards:
             self.available_cards = self.available_cards[self.available_cards != card]
         return [self.display_card(card) for card in cards]
 
-    def deal_hole_cards(self):
-        for player in range(self.num_players):
-            self.hole_cards[player] = self.draw_cards(2)
+    def deal_hole_cards(self, hand_order=None):
+        """hands are drawn in seat order, hand_order[player] picks which of them the player at that seat is given"""
+        hands = [self.draw_cards(2) for player in range(self.num_players)]
+        hand_order = range(self.num_players) if hand_order is None else hand_order
+        for player, hand in enumerate(hand_order):
+            self.hole_cards[player] = hands[hand]
+            self.evaluators[player] = HandEvaluator(self.hole_cards[player])
         return self.hole_cards
 
     def deal_community_cards(self, num_cards):
         cards = self.draw_cards(num_cards)
         self.community_cards += cards
+        for evaluator in self.evaluators:
+            evaluator.add_board_cards(cards)
         return cards
 
-    def get_high_card(self, best_cards: np.ndarray):
-        hand_numbers = np.apply_along_axis(lambda x: int('' .join(x)), 1, np.apply_along_axis(lambda x: x == max(x), 0, best_cards).astype(int).astype(str))
-        hand_rank = np.array([(hand_number > hand_numbers).sum() for hand_number in hand_numbers])
-        return hand_rank
-
     def determine_hand_ranks(self, playing):
-        hands = []
-        for player in range(self.num_players):
-            if not playing[player]:
-                continue
-            hands.append(Hand(self.hole_cards[player] + self.community_cards))
-        hand_types = np.array([hand.hand_type for hand in hands])
-        hand_ranks = np.array([(hand_type > hand_types).sum() for hand_type in hand_types])
-
-        for hand_type in np.unique(hand_types):
-            if (hand_type_mask := (hand_type == hand_types)).sum() > 1:
-                # straight (flush)
-                if hand_type == 8 or hand_type == 4:
-                    straight_highs = np.array([hand.hand['straight high'] for hand, type in zip(hands, hand_types) if type == hand_type])
-                    hand_ranks[hand_type_mask] += np.array([(high > straight_highs).sum() for high in straight_highs])
-                # four of a kind, three of a kind, one pair
-                elif hand_type == 7 or hand_type == 3 or hand_type == 1:
-                    hands_kind = [hand for hand, type in zip(hands, hand_types) if type == hand_type]
-                    faces = np.array([hand.hand['face'] for hand in hands_kind])
-                    num_kickers = 1 if hand_type == 7 else 2 if hand_type == 3 else 3
-                    kickers = np.array([np.array([card for card in hand.sorted_cards if card != face])[:num_kickers] for hand, face in zip(hands_kind, faces)])
-                    kicker_ranks = self.get_high_card(kickers)
-                    hand_ranks[hand_type_mask] += np.array([(face > faces).sum() + (kicker_rank > kicker_ranks[faces == face]).sum() for face, kicker_rank in zip(faces, kicker_ranks)])
-                # full house
-                elif hand_type == 6:
-                    set_faces = np.array([hand.hand['set face'] for hand, type in zip(hands, hand_types) if type == hand_type])
-                    pair_faces = np.array([hand.hand['pair face'] for hand, type in zip(hands, hand_types) if type == hand_type])
-                    hand_ranks[hand_type_mask] += np.array([(set_face > set_faces).sum() + (pair_face > pair_faces[set_faces == set_face]).sum() for set_face, pair_face in zip(set_faces, pair_faces)])
-                # flush
-                elif hand_type == 5:
-                    flush_highs = np.array([hand.hand['flush high'] for hand, type in zip(hands, hand_types) if type == hand_type])
-                    hand_ranks[hand_type_mask] += np.array([(high > flush_highs).sum() for high in flush_highs])
-                # two pair
-                elif hand_type == 2:
-                    hands_kind = [hand for hand, type in zip(hands, hand_types) if type == hand_type]
-                    high_faces = np.array([hand.hand['high face'] for hand in hands_kind])
-                    low_faces = np.array([hand.hand['low face'] for hand in hands_kind])
-                    kickers = np.array([np.array([card for card in hand.sorted_cards if card not in (high_face, low_face)]) for hand, high_face, low_face in zip(hands_kind, high_faces, low_faces)])
-                    kicker_ranks = self.get_high_card(kickers[:, :1])
-                    hand_ranks[hand_type_mask] += np.array([(high_face > high_faces).sum() + (low_face > low_faces[high_faces == high_face]).sum() + (kicker_rank > kicker_ranks[(high_faces == high_face) & (low_faces == low_face)]).sum() for high_face, low_face, kicker_rank in zip(high_faces, low_faces, kicker_ranks)])
-                # high card
-                else:
-                    best_five_cards = np.array([np.array([hand.sorted_cards[card] for hand, type in zip(hands, hand_types) if type == hand_type]) for card in range(5)]).T # getting top 5 cards
-                    high_card_ranks = self.get_high_card(best_five_cards)
-                    hand_ranks[hand_type_mask] += high_card_ranks
-
+        strengths = np.array([self.evaluators[player].strength() for player in range(self.num_players) if playing[player]])
+        hand_ranks = np.array([(strength > strengths).sum() for strength in strengths])
         final_ranks = np.zeros(len(playing))
         final_ranks[playing] = hand_ranks + 1
         return final_ranks
 
 
 class Table:
-    def __init__(self) -> None:
+    # (name, community cards dealt) for each street
+    STREETS = [("pre-flop", 0), ("flop", 3), ("turn", 1), ("river", 1)]
+
+    def __init__(self, all_in_equity=False) -> None:
+        """
+        all_in_equity - when everyone left in a hand is all in before the river, also score the hand by each
+                        player's expected payout over the remaining runouts (see adjusted_winnings)
+        """
         self.num_players = 0
         self.__players = []
         self.names = []
         self.chip_stacks = np.zeros(self.num_players)
+        self.all_in_equity = all_in_equity
+        self.winnings = {}
+        self.adjusted_winnings = {}
         self.init_hand()
 
     def register_player(self, name, algo):
@@ -107,6 +129,8 @@ class Table:
         self.names.append(name)
         self.__players.append(algo)
         self.chip_stacks = np.append(self.chip_stacks, algo.get_chip_stack())
+        self.winnings.setdefault(name, 0.)
+        self.adjusted_winnings.setdefault(name, 0.)
         self.num_players += 1
 
     def remove_player(self, name):
@@ -118,9 +142,10 @@ class Table:
         self.chip_stacks = np.delete(self.chip_stacks, player_num[0])
         self.num_players -= 1
 
-    def issue_hole_cards(self, hole_cards):
+    def issue_hole_cards(self, hole_cards, evaluators=None):
+        """evaluators - the dealer's evaluator per seat, handed to the players so showdown and bots share one"""
         for player in range(self.num_players):
-            self.__players[player].get_hole_cards(hole_cards[player])
+            self.__players[player].get_hole_cards(hole_cards[player], evaluator=None if evaluators is None else evaluators[player])
 
     def share_community_cards(self, community_cards):
         for player in range(self.num_players):
@@ -135,12 +160,18 @@ class Table:
         playing - array of True if player is still playing in current hand and False otherwise 
         active - array of True if player is still active (playing and not all in) in current hand and False otherwise
         pot - current pot
+        street - 0 for pre-flop, then 1, 2 and 3 for the flop, turn and river
+        vpip, pfr - arrays of True if player voluntarily put chips in / raised pre-flop
         """
         self.shares = np.zeros(self.num_players)
         self.playing = self.chip_stacks > 0
         self.active = self.chip_stacks > 0
         self.reset_bets()
         self.pot = 0
+        self.street = 0
+        self.vpip = np.zeros(self.num_players, dtype=bool)
+        self.pfr = np.zeros(self.num_players, dtype=bool)
+        self.expected_payouts = None
 
     def bet_blinds(self, LB, BB):
         # little blind
@@ -173,13 +204,18 @@ class Table:
         self.__players[player].update_stack(amount)
 
     def get_hand_state(self, betting_round):
-        hand_state = HandState(self.active, self.bets, self.pot, self.shares, betting_round)
+        hand_state = HandState(self.active, self.bets, self.pot, self.shares, betting_round, self.chip_stacks)
         return hand_state
 
+    def betting_closed(self):
+        """nobody is left to act: at most one player is active and they have matched the highest bet"""
+        return self.active.sum() <= 1 and (self.bets[self.active] >= self.bets.max()).all()
+
     def round_of_betting(self, start=0, verbose=False):
-        if self.active.sum() < 2:
-            pass
+        run_steps(self.round_of_betting_steps(start=start, verbose=verbose))
 
+    def round_of_betting_steps(self, start=0, verbose=False):
+        """round_of_betting as a generator, passing on the (policy, features) requests of players deciding through Player.move_steps"""
         max_bet = -1
         last_raiser = (start-1) % self.num_players
         betting_round = 0
@@ -193,7 +229,7 @@ class Table:
                     continue
                 if seat == last_raiser and betting_round > 0:
                     break
-                if self.active.sum() <= 1:
+                if self.betting_closed():
                     break
 
                 # updating each player on current state of hand
@@ -202,8 +238,11 @@ class Table:
                     self.__players[j].update_hand_state(hand_state.add_player_seat((j+start) % self.num_players))
 
                 # proceeding with betting
-                move = self.__players[seat].make_move(seat, self.playing, self.bets, self.pot, self.shares, betting_round)
+                move = yield from self.__players[seat].move_steps(seat, self.playing, self.bets, self.pot, self.shares, betting_round)
                 max_bet = self.bets.max()
+                if self.street == 0:
+                    self.vpip[seat] |= move.move in ("call", "raise")
+                    self.pfr[seat] |= move.move == "raise"
 
                 if verbose:
                     print("\nseat: {:d}, pot: {:.2f}, highest bet: {:.2f}, last raiser: {:d}, betting round: {:d}, num active: {:d}".format(seat, self.pot + self.bets.sum(), max_bet, last_raiser, betting_round, self.active.sum()))
@@ -242,13 +281,13 @@ class Table:
                         print("{} (seat {}) checks!".format(self.names[seat], seat))
                 else:
                     if move.amount > self.chip_stacks[seat]:
-                        raise ValueError("{} attempted to bet {} when they only have {}!".format(self.names[seat], move.amount, self.chip_stacks[i]))
+                        raise ValueError("{} attempted to bet {} when they only have {}!".format(self.names[seat], move.amount, self.chip_stacks[seat]))
                     elif move.amount + self.bets[seat] <= max_bet:
                         raise ValueError("{} attempted to raise {} when they must raise at least {} to not call, check, or fold".format(self.names[seat], move.amount, max_bet-self.bets[seat]+1))
-                    elif move.amount == self.chip_stacks[i]:
+                    elif move.amount == self.chip_stacks[seat]:
                         if verbose:
                             print("{} is all in!".format(self.names[seat]))
-                        # round_shares[i] = self.bets[i] = self.chip_stacks[i] + self.bets[i]
+                        self.bets[seat] += move.amount
                         self.update_stack(seat, -self.chip_stacks[seat])
                         self.active[seat] = False
                         last_raiser = seat
@@ -261,50 +300,22 @@ class Table:
                         last_raiser = seat
             betting_round += 1
             max_bet = self.bets.max()
-            if self.active.sum() <= 1:
-                    break
+            if self.betting_closed():
+                break
         # self.shares = (self.shares + round_shares) * self.active
         self.shares += self.bets
         self.pot += self.bets.sum()
         self.reset_bets()
 
     def showdown(self, hand_ranks, verbose=False):
-        winning_hands = hand_ranks == hand_ranks.max()
-        share_orders = np.argsort(self.shares[winning_hands])
-        share_bits = np.diff(self.shares[winning_hands], prepend=0)
-        num_winners = winning_hands.sum()
-        payouts = np.zeros(num_winners)
-        shares_left = self.shares.copy()
-
-        while shares_left.sum() > 0:
-            if verbose:
-                print("winning hands:", end=' ')
-                print(winning_hands)
-                with np.printoptions(precision=3, suppress=True):
-                    print("shares:", end=' ')
-                    print(self.shares)
-                    print("share orders:", end=' ')
-                    print(share_orders)
-
-            for share_bit, num_payed in zip(share_bits, np.arange(num_winners)):
-                shares_diff = shares_left-share_bit
-                payouts[share_orders[:(num_winners-num_payed)]] += (self.num_players*share_bit + (shares_diff*(shares_diff < 0)).sum()) / (num_winners-num_payed)
-                shares_left = shares_diff * (shares_diff > 0)
-                if verbose:
-                    print("share bit: {:.2f}".format(share_bit))
-                    with np.printoptions(precision=3, suppress=True):
-                        print("shares left: ", end='')
-                        print(shares_left)
-
-            if shares_left.sum() > 0:
-                shares_left[winning_hands] = 0
-                hand_ranks[winning_hands] = -1
-                winning_hands = hand_ranks == hand_ranks.max()
-                num_winners = winning_hands.sum()
-                share_bits = np.diff(shares_left[winning_hands], prepend=0)
+        payouts = split_pot(self.shares, hand_ranks)
 
         if verbose:
+            print("hand ranks:", end=' ')
+            print(hand_ranks)
             with np.printoptions(precision=3, suppress=True):
+                print("shares:", end=' ')
+                print(self.shares)
                 print("payouts: ", end='')
                 print(payouts)
                 print("chip stacks before: ", end='')
@@ -316,13 +327,42 @@ class Table:
             raise RuntimeError("total payouts ({:.8f}) are not equal to pot ({:.8f})!".format(payouts.sum(), self.pot))
 
         # updating chip stacks
-        self.chip_stacks[winning_hands] += payouts
-        for player, payout in zip([player for player, winning_hand in zip(self.__players, winning_hands) if winning_hand], payouts):
-            player.update_stack(payout)
+        for player in np.flatnonzero(payouts):
+            self.update_stack(player, payouts[player])
         if verbose:
             with np.printoptions(precision=3, suppress=True):
                 print("chip stacks after: ", end='')
                 print(self.chip_stacks)
+        return payouts
+
+    def record_all_in_equity(self, hole_cards, community_cards, verbose=False):
+        """once nobody can bet any more with cards still to come, stores each player's expected payout"""
+        if not self.all_in_equity or self.expected_payouts is not None or len(community_cards) == 5:
+            return
+        if self.playing.sum() < 2 or self.active.sum() > 1:
+            return
+        hands = tuple(tuple(sorted(card_to_int(card) for card in hole_cards[player])) for player in np.flatnonzero(self.playing))
+        board = tuple(card_to_int(card) for card in community_cards)
+        strengths = all_in_runout_strengths(hands, board)
+        hand_ranks = np.zeros((len(strengths), self.num_players))
+        hand_ranks[:, self.playing] = strengths + 1
+        self.expected_payouts = np.mean([split_pot(self.shares, runout_ranks) for runout_ranks in hand_ranks], axis=0)
+        if verbose:
+            with np.printoptions(precision=3, suppress=True):
+                print("all in, expected payouts: ", end='')
+                print(self.expected_payouts)
+
+    def record_winnings(self, start_stacks, payouts):
+        """chip result of the hand, and the same result with the actual all in payouts swapped for expected ones"""
+        adjusted = self.chip_stacks - start_stacks
+        if self.expected_payouts is not None:
+            adjusted += self.expected_payouts - payouts
+        showdown = self.playing & (self.playing.sum() > 1)
+        self.hand_summary = {}
+        for seat, (name, chips, adjusted_chips) in enumerate(zip(self.names, self.chip_stacks - start_stacks, adjusted)):
+            self.winnings[name] += chips
+            self.adjusted_winnings[name] += adjusted_chips
+            self.hand_summary[name] = {"chips": chips, "winnings": adjusted_chips, "vpip": self.vpip[seat], "pfr": self.pfr[seat], "showdown": showdown[seat]}
 
     def show_hands(self, hole_cards, community_cards):
         print("\nPlayers' hands:", end='')
@@ -348,56 +388,67 @@ class Table:
         self.chip_stacks = np.array(rotate_list(self.chip_stacks.tolist(), 1))
         self.names = rotate_list(self.names, 1)
 
-    def play_hand(self, LB, BB, verbose=False):
+    def play_hand(self, LB, BB, verbose=False, seed=None, hand_order=None):
+        """
+        plays one hand street by street, stopping as soon as it is uncontested:
+        cards nobody will see are never dealt or evaluated, and betting is skipped once nobody can act
+        """
+        run_steps(self.play_hand_steps(LB, BB, verbose=verbose, seed=seed, hand_order=hand_order))
+
+    def play_hand_steps(self, LB, BB, verbose=False, seed=None, hand_order=None):
+        """
+        play_hand as a generator: yields a (policy, features) request whenever a player needs a policy
+        decision and resumes with the action probabilities sent back, so many tables can be stepped
+        together and their decisions batched (see batching.play_tables)
+        """
         if verbose:
             print("\n\n--- new hand ---")
 
         # init
-        dealer = Dealer(self.num_players)
+        dealer = Dealer(self.num_players, seed=seed)
         self.init_hand()
+        start_stacks = self.chip_stacks.copy()
         community_cards = []
 
-        if verbose:
-            print("\n\npre-flop")
-
         # deal hole cards
-        hole_cards = dealer.deal_hole_cards()
-        self.issue_hole_cards(hole_cards)
+        hole_cards = dealer.deal_hole_cards(hand_order)
+        self.issue_hole_cards(hole_cards, dealer.evaluators)
         self.bet_blinds(LB, BB)
-        self.round_of_betting(start=2, verbose=verbose)
 
-        # flop
-        if verbose:
-            print("\n\nflop")
-
-        community_cards += dealer.deal_community_cards(3)
-        self.share_community_cards(community_cards)
-        self.round_of_betting(verbose=verbose)
-
-        # turn card
-        if verbose:
-            print("\n\nturn")
-
-        community_cards += dealer.deal_community_cards(1)
-        self.round_of_betting(verbose=verbose)
-
-        # river card
-        if verbose:
-            print("\n\nriver")
-
-        community_cards += dealer.deal_community_cards(1)
-        self.round_of_betting(verbose=verbose)
-
-        if verbose:
-            self.show_hands(hole_cards, community_cards)
+        for self.street, (street_name, num_cards) in enumerate(self.STREETS):
+            if self.playing.sum() < 2:
+                break
+            if verbose:
+                print("\n\n{}".format(street_name))
+
+            if num_cards > 0:
+                community_cards += dealer.deal_community_cards(num_cards)
+                self.share_community_cards(community_cards)
+            if not self.betting_closed():
+                yield from self.round_of_betting_steps(start=2 if self.street == 0 else 0, verbose=verbose)
+            else:
+                self.shares += self.bets
+                self.pot += self.bets.sum()
+                self.reset_bets()
+            self.record_all_in_equity(hole_cards, community_cards, verbose=verbose)
+
+        if self.playing.sum() < 2:
+            # uncontested, the last player standing takes the pot without showing
+            if verbose:
+                print("\n{} wins uncontested!".format(self.names[np.flatnonzero(self.playing)[0]]))
+            hand_ranks = self.playing.astype(float)
+        else:
+            if verbose:
+                self.show_hands(hole_cards, community_cards)
+            hand_ranks = dealer.determine_hand_ranks(self.playing)
 
-        # showdown + distribute pot
-        hand_ranks = dealer.determine_hand_ranks(self.playing)
-        self.showdown(hand_ranks, verbose=verbose)
+        # distribute pot
+        payouts = self.showdown(hand_ranks, verbose=verbose)
+        self.record_winnings(start_stacks, payouts)
 
         if verbose:
             self.show_stacks_according_to_players()
-        
+
         # setup for next game
         self.move_blinds()
 
@@ -426,28 +477,130 @@ class Poker:
         self.big_blind = big_blind
 
 
+def seat_orders(num_players, permutations="rotations"):
+    if permutations == "rotations":
+        return [rotate_list(list(range(num_players)), n) for n in range(num_players)]
+    elif permutations == "all":
+        return [list(order) for order in itertools.permutations(range(num_players))]
+    raise ValueError("invalid permutations {}, must be one of 'rotations' or 'all'".format(permutations))
+
+def play_duplicate_match(bots, num_deals, little_blind, big_blind, buy_in, seed=None, mode="seats", permutations="rotations", all_in_equity=False, verbose=False):
+    """
+    duplicate poker: every seeded deal is replayed once per seat order, with fresh bots and stacks each time,
+    and each bot is scored by its combined chip result over the replays of a deal, so card luck cancels out
+    bots - dict of name to a constructor taking the buy in
+    mode - 'seats' moves the bots around the table (cards stay with the seats), 'cards' keeps the bots
+           seated in order and moves the hole cards between them instead (positions are not balanced)
+    all_in_equity - score with equity-adjusted winnings rather than chip results
+    returns a (num_deals, num_bots) array of duplicate scores, columns in the order of bots
+    """
+    if mode not in ("seats", "cards"):
+        raise ValueError("invalid mode {}, must be one of 'seats' or 'cards'".format(mode))
+    names = list(bots)
+    deal_seeds = np.random.SeedSequence(seed).generate_state(num_deals)
+    scores = np.zeros((num_deals, len(names)))
+
+    for deal, deal_seed in enumerate(deal_seeds):
+        for order in seat_orders(len(names), permutations):
+            table = Table(all_in_equity=all_in_equity)
+            seated = [names[bot] for bot in order] if mode == "seats" else names
+            for name in seated:
+                table.register_player(name, bots[name](buy_in))
+            table.play_hand(little_blind, big_blind, verbose=verbose, seed=int(deal_seed), hand_order=order if mode == "cards" else None)
+            for name, winnings in table.adjusted_winnings.items():
+                scores[deal, names.index(name)] += winnings
+    return scores
+
+def play_match(fpath, names, hands, little_blind, big_blind, buy_in, seed=None, all_in_equity=False):
+    """plays a match between bots from the registry for fpath, returns their (equity-adjusted) winnings in the order of names"""
+    registry = get_registry(fpath)
+    table = Table(all_in_equity=all_in_equity)
+    for name in names:
+        table.register_player(name, registry.create(name, buy_in))
+
+    for hand in range(hands):
+        table.play_hand(little_blind, big_blind, seed=None if seed is None else seed + hand)
+        for name, chip_stack in zip(list(table.names), table.chip_stacks):
+            if chip_stack == 0:
+                table.remove_player(name)
+        if table.num_players == 1:
+            break
+    return [table.adjusted_winnings[name] for name in names]
+
+def play_round_robin(fpath, names, hands, little_blind, big_blind, buy_in, seed=None, all_in_equity=False, processes=None):
+    """
+    heads-up match between every pair of bots, spread over a process pool whose workers import every bot
+    once when they start, so matches don't pay import and startup costs
+    returns a dict of (name, name) pairs to their winnings
+    """
+    pairs = list(itertools.combinations(names, 2))
+    matches = [(fpath, pair, hands, little_blind, big_blind, buy_in, seed, all_in_equity) for pair in pairs]
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(fpath, names)) as pool:
+        results = pool.starmap(play_match, matches)
+    return dict(zip(pairs, results))
+
+
 if __name__  == '__main__':
     args = parse_argv()
-    player_files = [file for file in listdir(args.fpath) if file.startswith("player_")]
-    names = [file.removeprefix("player_").removesuffix(".py") for file in player_files]
+    registry = get_registry(args.fpath)
+    names = registry.names()
     stdout = sys.stdout
     if args.outfile is not None:
         sys.stdout = open(args.outfile, 'w')
 
+    if args.round_robin:
+        names = names if len(names) >= 2 else list(registry.builtins)
+        results = play_round_robin(args.fpath, names, args.hands, args.little_blind, args.big_blind, args.buy_in, seed=args.seed, all_in_equity=args.all_in_ev, processes=args.processes)
+        print("\nRound robin results over {} hands per match:".format(args.hands), file=stdout)
+        for pair, winnings in results.items():
+            print("{} vs {}: {:.2f} / {:.2f}".format(*pair, *winnings), file=stdout)
+        totals = {name: sum(winnings[pair.index(name)] for pair, winnings in results.items() if name in pair) for name in names}
+        print("\nTotal winnings:", file=stdout)
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]):
+            print("{}: {:.2f}".format(name, total), file=stdout)
+        if args.outfile is not None:
+            sys.stdout.close()
+        sys.exit()
+
+    if len(names) >= 2:
+        # bots from player_*.py files under --fpath, each imported when first created
+        bots = {name: functools.partial(registry.create, name) for name in names}
+    else:
+        bots = {
+            "Caller 1": Caller,
+            "Caller 2": Caller,
+            "Small Raiser 1": SmallRaiser,
+            "Small Raiser 2": SmallRaiser,
+            "Small Raiser 3": SmallRaiser,
+            "Caller 3": Caller,
+        }
+
+    if args.duplicate:
+        scores = play_duplicate_match(bots, args.hands, args.little_blind, args.big_blind, args.buy_in, seed=args.seed, mode=args.duplicate_mode, permutations=args.permutations, all_in_equity=args.all_in_ev, verbose=args.verbose)
+        print("\nDuplicate results over {} deals:".format(args.hands), file=stdout)
+        for name, bot_scores in zip(bots, scores.T):
+            print("{}: {:.2f} ({:.3f} +/- {:.3f} per deal)".format(name, bot_scores.sum(), bot_scores.mean(), bot_scores.std() / np.sqrt(len(bot_scores))), file=stdout)
+        if args.outfile is not None:
+            sys.stdout.close()
+        sys.exit()
+
     # registering players at table
-    table = Table()
-    table.register_player("Caller 1", Caller(args.buy_in))
-    table.register_player("Caller 2", Caller(args.buy_in))
-    table.register_player("Small Raiser 1", SmallRaiser(args.buy_in))
-    table.register_player("Small Raiser 2", SmallRaiser(args.buy_in))
-    table.register_player("Small Raiser 3", SmallRaiser(args.buy_in))
-    table.register_player("Caller 3", Caller(args.buy_in))
+    table = Table(all_in_equity=args.all_in_ev)
+    for name, bot in bots.items():
+        table.register_player(name, bot(args.buy_in))
 
     # playing hands
+    stats = MatchStatistics(args.big_blind)
+    early_stop = args.early_stop or args.ci_width is not None
     for hand in range(args.hands):
         if hand % int(args.hands/10) == 0:
             print("Played {} hands!".format(hand), file=stdout)
-        table.play_hand(args.little_blind, args.big_blind, verbose=args.verbose)
+        table.play_hand(args.little_blind, args.big_blind, verbose=args.verbose, seed=None if args.seed is None else args.seed + hand)
+        stats.record_hand(table.hand_summary)
+
+        if early_stop and stats.should_stop(min_hands=args.min_hands, target_width=args.ci_width, names=table.names):
+            print("Stopping after {} hands, every win rate is decided!".format(hand+1), file=stdout)
+            break
 
         if (table.chip_stacks == 0).any():
             for name, chip_stack in zip(table.names, table.chip_stacks):
@@ -463,5 +616,12 @@ if __name__  == '__main__':
     for name, stack in zip(table.names, table.chip_stacks):
         print("{}: {:.2f}".format(name, stack), file=stdout)
 
+    stats.display(file=stdout)
+
+    if args.all_in_ev:
+        print("\nWinnings (equity-adjusted):", file=stdout)
+        for name in table.winnings:
+            print("{}: {:.2f} ({:.2f})".format(name, table.winnings[name], table.adjusted_winnings[name]), file=stdout)
+
     if args.outfile is not None:
         sys.stdout.close()
\ No newline at end of file
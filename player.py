@@ -1,12 +1,17 @@
+import time
 import numpy as np
 from abc import ABC, abstractmethod
-from utils import HandState, Move, Hand
+from utils import HandState, Move, HandEvaluator, card_to_int
+from resolver import StreetTree, SubgameSolver, RangeModel, EquityTable
+from equity import EquityEngine
+from batching import encode_decision
 
 class Player(ABC):
     def __init__(self, number_chips):
         self.chip_stack = number_chips
         self.__hole_cards = ['..', '..']
         self.community_cards = []
+        self.evaluator = None
 
     def update_stack(self, amount):
         if -amount > self.chip_stack:
@@ -16,11 +21,19 @@ class Player(ABC):
     def get_chip_stack(self):
         return self.chip_stack
 
-    def get_hole_cards(self, hole_cards):
+    def get_hole_cards(self, hole_cards, evaluator=None):
+        """
+        evaluator - the table's evaluator for this seat, already fed every board card by the dealer and
+                    read at showdown, so it must be left as it was found; a private one is built without it
+        """
         self.__hole_cards = hole_cards
+        self.community_cards = []
+        self.evaluator = HandEvaluator(hole_cards) if evaluator is None else evaluator
 
     def get_community_cards(self, community_cards):
         self.community_cards = community_cards
+        # a shared evaluator already holds them, a private one is fed the new cards only
+        self.evaluator.add_board_cards(community_cards[self.evaluator.num_board_cards:])
 
     @abstractmethod
     def update_hand_state(self, hand_state: HandState) -> None:
@@ -31,6 +44,14 @@ class Player(ABC):
         """given game state, returns a move: fold, call, or raise"""
         pass
 
+    def move_steps(self, seat: int, playing: np.ndarray, bets: np.ndarray, pot: float, shares: np.ndarray, betting_round: int):
+        """
+        make_move as a generator, for tables stepped together: a player deciding through a policy yields
+        (policy, features) and is sent back its row of action probabilities; by default it never yields
+        """
+        return self.make_move(seat, playing, bets, pot, shares, betting_round)
+        yield
+
 class Caller(Player):
     def update_hand_state(self, hand_state: HandState) -> None:
         pass 
@@ -62,4 +83,139 @@ class SmallRaiser(Player):
         elif calling_bet > my_last_bet and calling_bet <= self.chip_stack:
             return Move("call")
         else:
-            return Move("check")
\ No newline at end of file
+            return Move("check")
+
+class ResolvingPlayer(Player):
+    """
+    re-solves the rest of the current street at every decision with CFR+ (depth-limited subgame solving),
+    so off-tree bet sizes are answered from the real bets rather than a blueprint's nearest action;
+    opponents still in the hand are treated as a single villain
+    """
+    def __init__(self, number_chips, time_budget=0.5, max_iterations=1000, num_combos=40, num_runouts=12, seed=None):
+        super().__init__(number_chips)
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.num_combos = num_combos
+        self.num_runouts = num_runouts
+        self.rng = np.random.default_rng(seed)
+        self.engine = EquityEngine(max_runouts=num_runouts, seed=int(self.rng.integers(2**32)))
+        self.solver = SubgameSolver()
+        self.hand_state = None
+        self.new_hand([])
+
+    def new_hand(self, hole_cards):
+        self.hole_cards = hole_cards
+        self.ranges = RangeModel(hole_cards, self.num_combos, self.rng) if len(hole_cards) else None
+        self.board = []
+        self.equity_table = None
+        self.history = ()
+        self.pending = None
+        self.solver.reset()
+
+    def get_hole_cards(self, hole_cards, evaluator=None):
+        super().get_hole_cards(hole_cards, evaluator)
+        self.new_hand([card_to_int(card) for card in hole_cards])
+
+    def update_hand_state(self, hand_state: HandState) -> None:
+        self.hand_state = hand_state
+
+    def observe_street_end(self):
+        """the street closed after our last action, so a villain node we were waiting on was a check or call"""
+        if self.pending is not None and self.pending.kind == "villain":
+            self.update_villain_range(self.pending, 0 if self.pending.actions[0][0] == "check" else 1)
+        self.pending = None
+        self.history = ()
+
+    def observe_raise(self, amount):
+        """the villain raised since our last action, translate it to the nearest raise in our last tree"""
+        if self.pending is None or self.pending.kind != "villain":
+            return
+        raises = [(abs(size - amount), a) for a, (move, size) in enumerate(self.pending.actions) if move == "raise"]
+        if len(raises) == 0:
+            return
+        action = min(raises)[1]
+        self.update_villain_range(self.pending, action)
+        self.history = self.pending.children[action].history
+
+    def update_villain_range(self, node, action):
+        strategy = self.solver.average_strategy(node, len(self.ranges.villain_weights))
+        self.ranges.villain_weights *= strategy[:, action]
+
+    def villain_stack(self, seat, playing):
+        """chips behind of the deepest opponent still in the hand, the most the single villain can put in"""
+        if self.hand_state is None or self.hand_state.chip_stacks is None:
+            return self.chip_stack
+        others = np.delete(np.arange(len(playing)), seat)
+        others = others[playing[others]]
+        return self.hand_state.chip_stacks[others].max() if len(others) > 0 else 0.
+
+    def to_move(self, action, to_call):
+        move, amount = action
+        if move == "raise":
+            return Move("raise", amount=min(amount, self.chip_stack))
+        if move == "call" and to_call == 0:
+            return Move("check")
+        return Move(move)
+
+    def make_move(self, seat: int, playing: np.ndarray, bets: np.ndarray, pot: float, shares: np.ndarray, betting_round: int) -> Move:
+        deadline = time.perf_counter() + self.time_budget
+        board = [card_to_int(card) for card in self.community_cards]
+
+        hero_bet = bets[seat]
+        villain_bet = np.delete(bets, seat).max()
+        if len(board) != len(self.board):
+            self.observe_street_end()
+            self.board = board
+            self.ranges.remove_blocked(board)
+            self.equity_table = None
+            self.solver.new_street()
+        elif self.pending is not None and villain_bet > self.pending.contributions[1]:
+            self.observe_raise(villain_bet - self.pending.contributions[1])
+
+        if self.equity_table is None:
+            self.equity_table = EquityTable(self.ranges.hero_combos, self.ranges.villain_combos, board, self.engine)
+
+        dead = pot + bets.sum() - hero_bet - villain_bet
+        tree = StreetTree(dead, [hero_bet, villain_bet], [self.chip_stack, self.villain_stack(seat, playing)], history=self.history)
+        self.solver.solve(tree, self.equity_table.equity, self.equity_table.valid,
+                          self.ranges.normalized(self.ranges.hero_weights), self.ranges.normalized(self.ranges.villain_weights),
+                          deadline, max_iterations=self.max_iterations)
+
+        strategy = self.solver.average_strategy(tree.root, self.num_combos)
+        action = self.rng.choice(len(tree.root.actions), p=strategy[0])
+        self.ranges.hero_weights *= strategy[:, action]
+        self.pending = tree.root.children[action]
+        return self.to_move(tree.root.actions[action], max(villain_bet - hero_bet, 0))
+
+
+class PolicyPlayer(Player):
+    """
+    plays from a Policy over encoded decisions, one decision at a time through make_move, or batched with
+    the decisions of other tables through move_steps (see batching.play_tables)
+    """
+    def __init__(self, number_chips, policy, raise_fraction=0.5, seed=None):
+        super().__init__(number_chips)
+        self.policy = policy
+        self.raise_fraction = raise_fraction
+        self.rng = np.random.default_rng(seed)
+
+    def update_hand_state(self, hand_state: HandState) -> None:
+        pass
+
+    def make_move(self, seat: int, playing: np.ndarray, bets: np.ndarray, pot: float, shares: np.ndarray, betting_round: int) -> Move:
+        probs = self.policy.decide(encode_decision(self.evaluator, seat, playing, bets, pot, self.chip_stack))
+        return self.choose_move(probs, seat, bets, pot)
+
+    def move_steps(self, seat: int, playing: np.ndarray, bets: np.ndarray, pot: float, shares: np.ndarray, betting_round: int):
+        probs = yield self.policy, encode_decision(self.evaluator, seat, playing, bets, pot, self.chip_stack)
+        return self.choose_move(probs, seat, bets, pot)
+
+    def choose_move(self, probs, seat, bets, pot):
+        action = self.rng.choice(len(probs), p=probs)
+        to_call = bets.max() - bets[seat]
+        if action == 0 and to_call > 0:
+            return Move("fold")
+        if action == 2 and self.chip_stack > to_call:
+            raise_size = max(1, np.round(self.raise_fraction * (pot + bets.sum() + to_call)))
+            return Move("raise", amount=min(to_call + raise_size, self.chip_stack))
+        return Move("call") if to_call > 0 else Move("check")
@@ -0,0 +1,72 @@
+import os
+import sys
+import functools
+import importlib.util
+
+
+class BotRegistry:
+    """
+    bots found as player_<name>.py files (each defining MyPlayer(buy_in)) under a directory, plus built in bots;
+    the directory is listed once and put on sys.path (so bots can import helper modules next to them),
+    and each file is imported lazily, at most once per process, with its constructor cached
+    """
+    def __init__(self, fpath='.', builtins=None):
+        self.fpath = os.path.abspath(fpath)
+        if self.fpath not in sys.path:
+            sys.path.append(self.fpath)
+        self.builtins = {} if builtins is None else dict(builtins)
+        self.paths = {
+            file.removeprefix("player_").removesuffix(".py"): os.path.join(self.fpath, file)
+            for file in sorted(os.listdir(self.fpath)) if file.startswith("player_") and file.endswith(".py")
+        }
+        self.constructors = {}
+
+    def names(self):
+        """bots found on disk, in file name order"""
+        return list(self.paths)
+
+    def constructor(self, name):
+        if name in self.constructors:
+            return self.constructors[name]
+        if name not in self.paths:
+            if name not in self.builtins:
+                raise ValueError("no bot named {} under {}".format(name, self.fpath))
+            self.constructors[name] = self.builtins[name]
+            return self.constructors[name]
+
+        module_name = "player_{}".format(name)
+        module = sys.modules.get(module_name)
+        if module is None or getattr(module, "__file__", None) != self.paths[name]:
+            spec = importlib.util.spec_from_file_location(module_name, self.paths[name])
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                # don't leave a half-initialized module behind for the next call to find
+                del sys.modules[module_name]
+                raise
+        self.constructors[name] = module.MyPlayer
+        return self.constructors[name]
+
+    def create(self, name, buy_in):
+        return self.constructor(name)(buy_in)
+
+    def warm(self, names=None):
+        """imports every bot in names (default all found on disk) up front"""
+        for name in (self.names() if names is None else names):
+            self.constructor(name)
+
+
+def builtin_bots():
+    from player import Caller, SmallRaiser
+    return {"Caller": Caller, "SmallRaiser": SmallRaiser}
+
+@functools.lru_cache(maxsize=None)
+def get_registry(fpath='.'):
+    """the process-wide registry for a directory, built in bots included"""
+    return BotRegistry(fpath, builtins=builtin_bots())
+
+def init_worker(fpath, names=None):
+    """pool initializer, pays the import and startup cost of every bot once per worker rather than per match"""
+    get_registry(fpath).warm(names)
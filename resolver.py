@@ -0,0 +1,218 @@
+import time
+import numpy as np
+from utils import all_combos
+from equity import combo_index
+
+
+class Node:
+    """
+    node of a single-street betting subgame between the hero (player 0) and the villain (player 1)
+    contributions - chips each of hero and villain have put in the pot this street
+    kind - 'hero' or 'villain' for decision nodes, 'fold' or 'showdown' for terminal nodes
+    """
+    def __init__(self, kind, contributions, history, folder=None):
+        self.kind = kind
+        self.contributions = contributions
+        self.history = history
+        self.folder = folder
+        self.actions = []
+        self.children = []
+
+    def is_terminal(self):
+        return self.kind in ("fold", "showdown")
+
+
+class StreetTree:
+    """
+    abstract betting tree for the rest of the current street, starting at the hero's decision;
+    raises are pot fractions plus all in, and the street ending is a depth-limited leaf valued by equity
+    """
+    def __init__(self, dead, bets, stacks, raise_fractions=(0.5, 1.0), max_raises=2, history=()):
+        self.dead = dead
+        self.raise_fractions = raise_fractions
+        self.max_raises = max_raises
+        self.root = self.build("hero", np.array(bets, dtype=float), np.array(stacks, dtype=float), 0, False, history)
+
+    def raise_sizes(self, bets, stacks, actor):
+        to_call = bets.max() - bets[actor]
+        # raising more than the other side has behind is the same as raising all they can call
+        behind = min(stacks[actor] - to_call, stacks[1-actor])
+        if behind <= 0:
+            return []
+        pot = self.dead + bets.sum() + to_call
+        sizes = sorted(set(min(behind, max(1.0, np.round(fraction * pot))) for fraction in self.raise_fractions) | {behind})
+        return [to_call + size for size in sizes]
+
+    def build(self, kind, bets, stacks, num_raises, checked, history):
+        node = Node(kind, bets, history)
+        actor = 0 if kind == "hero" else 1
+        other = "villain" if kind == "hero" else "hero"
+        to_call = bets.max() - bets[actor]
+
+        if to_call > 0:
+            node.actions.append(("fold", 0))
+            node.children.append(Node("fold", bets, history + ("fold",), folder=actor))
+            amount = min(to_call, stacks[actor])
+            node.actions.append(("call", amount))
+            node.children.append(Node("showdown", self.put_in(bets, actor, amount), history + ("call",)))
+        else:
+            node.actions.append(("check", 0))
+            if checked:
+                node.children.append(Node("showdown", bets, history + ("check",)))
+            else:
+                node.children.append(self.build(other, bets, stacks, num_raises, True, history + ("check",)))
+
+        if num_raises < self.max_raises:
+            for amount in self.raise_sizes(bets, stacks, actor):
+                new_bets = self.put_in(bets, actor, amount)
+                new_stacks = stacks.copy()
+                new_stacks[actor] -= amount
+                node.actions.append(("raise", amount))
+                node.children.append(self.build(other, new_bets, new_stacks, num_raises + 1, True, history + ("raise", amount)))
+        return node
+
+    def put_in(self, bets, actor, amount):
+        bets = bets.copy()
+        bets[actor] += amount
+        return bets
+
+
+class SubgameSolver:
+    """
+    vector-form CFR+ over a StreetTree, solving for whole ranges of hero and villain combos at once;
+    regrets are kept between solves (keyed by betting history) so that re-solving warm starts
+    """
+    def __init__(self, warm_discount=0.5):
+        self.warm_discount = warm_discount
+        self.regrets = {}
+        self.strategy_sums = {}
+        self.tree = None
+
+    def reset(self):
+        self.regrets = {}
+        self.strategy_sums = {}
+        self.tree = None
+
+    def new_street(self):
+        """discounts what was learned on the previous street, keeping it as a starting point"""
+        for table in (self.regrets, self.strategy_sums):
+            for key in table:
+                table[key] *= self.warm_discount
+
+    def get_tables(self, node, num_combos):
+        shape = (num_combos, len(node.actions))
+        if node.history not in self.regrets or self.regrets[node.history].shape != shape:
+            self.regrets[node.history] = np.zeros(shape)
+            self.strategy_sums[node.history] = np.zeros(shape)
+        return self.regrets[node.history], self.strategy_sums[node.history]
+
+    def regret_matching(self, regrets):
+        positive = np.maximum(regrets, 0)
+        totals = positive.sum(axis=1, keepdims=True)
+        uniform = np.full_like(positive, 1 / positive.shape[1])
+        return np.where(totals > 0, positive / np.where(totals > 0, totals, 1), uniform)
+
+    def average_strategy(self, node, num_combos):
+        _, strategy_sum = self.get_tables(node, num_combos)
+        return self.regret_matching(strategy_sum)
+
+    def terminal_values(self, node, hero_reach, villain_reach):
+        hero_in, villain_in = node.contributions
+        if node.kind == "showdown":
+            utility = self.equity * (self.tree.dead + hero_in + villain_in) - hero_in * self.valid
+        elif node.folder == 0:
+            utility = -hero_in * self.valid
+        else:
+            utility = (self.tree.dead + villain_in) * self.valid
+        return utility @ villain_reach, -(hero_reach @ utility)
+
+    def cfr(self, node, hero_reach, villain_reach, weight):
+        if node.is_terminal():
+            return self.terminal_values(node, hero_reach, villain_reach)
+
+        hero_turn = node.kind == "hero"
+        own_reach = hero_reach if hero_turn else villain_reach
+        regrets, strategy_sum = self.get_tables(node, len(own_reach))
+        strategy = self.regret_matching(regrets)
+
+        hero_values, villain_values = [], []
+        for a, child in enumerate(node.children):
+            if hero_turn:
+                child_values = self.cfr(child, hero_reach * strategy[:, a], villain_reach, weight)
+            else:
+                child_values = self.cfr(child, hero_reach, villain_reach * strategy[:, a], weight)
+            hero_values.append(child_values[0])
+            villain_values.append(child_values[1])
+        hero_values = np.stack(hero_values, axis=1)
+        villain_values = np.stack(villain_values, axis=1)
+
+        own_values = hero_values if hero_turn else villain_values
+        node_values = (strategy * own_values).sum(axis=1)
+        regrets += own_values - node_values[:, None]
+        np.maximum(regrets, 0, out=regrets)
+        strategy_sum += weight * own_reach[:, None] * strategy
+
+        if hero_turn:
+            return node_values, villain_values.sum(axis=1)
+        return hero_values.sum(axis=1), node_values
+
+    def solve(self, tree, equity, valid, hero_weights, villain_weights, deadline, max_iterations=1000):
+        """runs CFR+ iterations until the deadline (a time.perf_counter value) or the iteration cap"""
+        self.tree = tree
+        self.equity = equity * valid
+        self.valid = valid.astype(float)
+        iterations = 0
+        while iterations < max_iterations and (iterations == 0 or time.perf_counter() < deadline):
+            iterations += 1
+            self.cfr(tree.root, hero_weights, villain_weights, iterations)
+        return iterations
+
+
+class RangeModel:
+    """
+    fixed per-hand samples of hero and villain combos with evolving weights;
+    hero's real hand is always combo 0 of the hero range
+    """
+    def __init__(self, hole_cards, num_combos, rng):
+        combos = all_combos()
+        self.hero_combos = np.vstack([np.sort(hole_cards), self.sample(combos, num_combos-1, rng, exclude=[])])
+        self.villain_combos = self.sample(combos, num_combos, rng, exclude=hole_cards)
+        self.hero_weights = np.ones(num_combos)
+        self.villain_weights = np.ones(num_combos)
+        self.remove_blocked([])
+
+    def sample(self, combos, num_combos, rng, exclude):
+        allowed = ~np.isin(combos, exclude).any(axis=1)
+        return combos[rng.choice(np.flatnonzero(allowed), size=num_combos, replace=False)]
+
+    def remove_blocked(self, board):
+        self.hero_weights[1:][np.isin(self.hero_combos[1:], board).any(axis=1)] = 0
+        self.villain_weights[np.isin(self.villain_combos, board).any(axis=1)] = 0
+
+    def normalized(self, weights):
+        total = weights.sum()
+        return weights / total if total > 0 else np.full_like(weights, 1 / len(weights))
+
+
+class EquityTable:
+    """
+    hero-vs-villain equity matrix for the sampled combos, over the runouts of an EquityEngine (all of them when
+    there are at most its max_runouts, else a fixed sample), reading combo strengths from its per-board cache
+    """
+    def __init__(self, hero_combos, villain_combos, board, engine):
+        self.overlap = (hero_combos[:, None, :, None] == villain_combos[None, :, None, :]).any(axis=(2, 3))
+        wins = np.zeros(self.overlap.shape)
+        counts = np.zeros(self.overlap.shape)
+        hero_index = [combo_index(card1, card2) for card1, card2 in hero_combos]
+        villain_index = [combo_index(card1, card2) for card1, card2 in villain_combos]
+
+        for runout in engine.runouts(list(board)):
+            strengths = engine.combo_strengths(runout)
+            hero_strengths = strengths[hero_index]
+            villain_strengths = strengths[villain_index]
+            seen = (hero_strengths >= 0)[:, None] & (villain_strengths >= 0)[None, :]
+            wins += seen * ((hero_strengths[:, None] > villain_strengths[None, :]) + 0.5 * (hero_strengths[:, None] == villain_strengths[None, :]))
+            counts += seen
+
+        self.valid = (counts > 0) & ~self.overlap
+        self.equity = np.where(self.valid, wins / np.maximum(counts, 1), 0)
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class RunningStat:
+    """running mean and variance of a stream (Welford's algorithm), O(1) memory"""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.
+        self.sum_sq_diff = 0.
+
+    def push(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.sum_sq_diff += delta * (x - self.mean)
+
+    def variance(self):
+        return self.sum_sq_diff / (self.count - 1) if self.count > 1 else np.inf
+
+    def std_error(self):
+        return np.sqrt(self.variance() / self.count) if self.count > 0 else np.inf
+
+    def confidence_sequence(self, alpha=0.05, rho=100.):
+        """
+        always-valid interval (two-sided normal mixture boundary, Howard et al. 2021): with probability 1 - alpha
+        it holds the true mean at every count at once, so it can be checked after every sample and stopped on;
+        rho sets where it is tightest (see mixture_rho), the sample variance stands in for the true one
+        """
+        if self.count < 2:
+            return -np.inf, np.inf
+        time = self.count + rho
+        half_width = np.sqrt(self.variance() * time * np.log(time / (rho * alpha**2))) / self.count
+        return self.mean - half_width, self.mean + half_width
+
+
+def mixture_rho(num_samples, alpha=0.05):
+    """mixture parameter making the confidence sequence (near) tightest after num_samples samples"""
+    return num_samples / (np.log(-2 * np.log(alpha) + 1) - 2 * np.log(alpha))
+
+
+class PlayerStats:
+    """
+    per-player statistics of a match, all kept online
+    win rate - big blinds won per 100 hands, with its (always-valid) confidence sequence
+    vpip - share of hands where the player put chips in preflop voluntarily (a call or a raise)
+    pfr - share of hands where the player raised preflop
+    showdown rate - share of hands where the player went to showdown
+    """
+    def __init__(self, big_blind):
+        self.big_blind = big_blind
+        self.results = RunningStat()
+        self.vpip_hands = 0
+        self.pfr_hands = 0
+        self.showdown_hands = 0
+
+    def record_hand(self, winnings, vpip, pfr, showdown):
+        self.results.push(winnings / self.big_blind)
+        self.vpip_hands += vpip
+        self.pfr_hands += pfr
+        self.showdown_hands += showdown
+
+    def hands(self):
+        return self.results.count
+
+    def win_rate(self):
+        return 100 * self.results.mean
+
+    def confidence_sequence(self, alpha=0.05, rho=100.):
+        low, high = self.results.confidence_sequence(alpha, rho)
+        return 100 * low, 100 * high
+
+    def rate(self, count):
+        return count / self.hands() if self.hands() > 0 else 0.
+
+    def vpip(self):
+        return self.rate(self.vpip_hands)
+
+    def pfr(self):
+        return self.rate(self.pfr_hands)
+
+    def showdown_rate(self):
+        return self.rate(self.showdown_hands)
+
+
+class MatchStatistics:
+    """
+    streaming statistics for every player in a match, fed one Table.hand_summary at a time,
+    with a sequential stopping rule so clearly decided matches don't have to be played out;
+    win rates are bounded by confidence sequences rather than fixed-sample intervals, since the rule
+    looks at them after every hand (a fixed 95% interval checked every hand excludes zero by luck
+    far more often than 5% of the time), tuned to be tightest around tuning_hands
+    """
+    def __init__(self, big_blind, alpha=0.05, tuning_hands=500):
+        self.big_blind = big_blind
+        self.alpha = alpha
+        self.rho = mixture_rho(tuning_hands, alpha)
+        self.players = {}
+
+    def record_hand(self, hand_summary):
+        for name, summary in hand_summary.items():
+            if name not in self.players:
+                self.players[name] = PlayerStats(self.big_blind)
+            self.players[name].record_hand(summary["winnings"], summary["vpip"], summary["pfr"], summary["showdown"])
+
+    def confidence_sequence(self, name, alpha=None):
+        return self.players[name].confidence_sequence(self.alpha if alpha is None else alpha, self.rho)
+
+    def is_decided(self, name, target_width=None, alpha=None):
+        """a player's win rate confidence sequence excludes zero, or is narrower than target_width (in bb/100)"""
+        low, high = self.confidence_sequence(name, alpha)
+        if low > 0 or high < 0:
+            return True
+        return target_width is not None and high - low <= target_width
+
+    def should_stop(self, min_hands=100, target_width=None, names=None):
+        """
+        stops once every player in names (default all) has a decided win rate; alpha is split across the players
+        (Bonferroni), so with probability 1 - alpha no player is called decided wrongly whenever the match stops;
+        min_hands guards against stopping on the first few hands, where the variance estimate is still unreliable
+        """
+        names = list(self.players) if names is None else names
+        if len(names) == 0 or min(self.players[name].hands() for name in names) < min_hands:
+            return False
+        return all(self.is_decided(name, target_width, self.alpha / len(names)) for name in names)
+
+    def display(self, file=None):
+        print("\n{:<20} {:>8} {:>10} {:>22} {:>6} {:>6} {:>6}".format("player", "hands", "bb/100", "{:.0%} CS".format(1 - self.alpha), "VPIP", "PFR", "WTSD"), file=file)
+        for name, stats in self.players.items():
+            low, high = self.confidence_sequence(name)
+            print("{:<20} {:>8d} {:>10.2f} {:>22} {:>6.3f} {:>6.3f} {:>6.3f}".format(
+                name, stats.hands(), stats.win_rate(), "[{:.2f}, {:.2f}]".format(low, high), stats.vpip(), stats.pfr(), stats.showdown_rate()), file=file)
+        print("CS - always-valid confidence sequence for bb/100, holds however often it was checked", file=file)
@@ -1,8 +1,187 @@
 from demo_players import Player
+from utils import win_masks, to_bitboard
+import time
 import numpy as np
 
+WIN = 10**6
+EXACT, LOWER, UPPER = 0, 1, 2
+SOLVED = float("inf")
+
+class SearchTimeout(Exception):
+    pass
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+class AlphaBetaSearch:
+    """
+    negamax alpha-beta search over bitboards for k-in-a-row on a width x width board (two players),
+    expanded lazily with move ordering and iterative deepening under a time budget
+    table - transposition table shared across moves and games, keyed by the (mover's, opponent's) bitboards
+            canonicalized over the 8 symmetries of the square; holds (depth, value, flag, best cell)
+    values - from the point of view of the player to move: WIN plus the empty cells left for a win
+             (so quicker wins score higher), minus that for a loss, 0 for a tie, and a heuristic in between
+    """
+    def __init__(self, width, in_a_row=None) -> None:
+        self.width = width
+        self.in_a_row = width if in_a_row is None else in_a_row
+        self.num_cells = width * width
+        self.full = (1 << self.num_cells) - 1
+        self.masks = win_masks(width, self.in_a_row)
+        self.masks_by_cell = [[mask for mask in self.masks if mask >> cell & 1] for cell in range(self.num_cells)]
+        # cells on more lines are tried first
+        self.move_order = sorted(range(self.num_cells), key=lambda cell: -len(self.masks_by_cell[cell]))
+        self.table = {}
+        self.init_symmetries()
+
+    def init_symmetries(self):
+        """per symmetry, the image of every cell and byte-wise lookup tables to permute a whole bitboard"""
+        cells = np.arange(self.num_cells).reshape(self.width, self.width)
+        images = []
+        for k in range(4):
+            rotated = np.rot90(cells, k)
+            for board in (rotated, np.fliplr(rotated)):
+                # board[r, c] = original cell now sitting at (r, c)
+                image = [0] * self.num_cells
+                for position, cell in enumerate(board.flatten()):
+                    image[cell] = position
+                images.append(image)
+        self.images = images
+        self.inverses = [[image.index(cell) for cell in range(self.num_cells)] for image in images]
+        num_chunks = (self.num_cells + 7) // 8
+        self.lookups = []
+        for image in images:
+            chunks = []
+            for chunk in range(num_chunks):
+                table = []
+                for byte in range(256):
+                    bits = 0
+                    for i in range(8):
+                        cell = chunk * 8 + i
+                        if byte >> i & 1 and cell < self.num_cells:
+                            bits |= 1 << image[cell]
+                    table.append(bits)
+                chunks.append(table)
+            self.lookups.append(chunks)
+
+    def permute(self, bits, symmetry):
+        permuted = 0
+        for chunk, table in enumerate(self.lookups[symmetry]):
+            permuted |= table[(bits >> (8 * chunk)) & 255]
+        return permuted
+
+    def canonical(self, mine, theirs):
+        best = None
+        for symmetry in range(len(self.lookups)):
+            key = (self.permute(mine, symmetry), self.permute(theirs, symmetry))
+            if best is None or key < best[0]:
+                best = (key, symmetry)
+        return best
+
+    def wins(self, bits, cell):
+        return any(bits & mask == mask for mask in self.masks_by_cell[cell])
+
+    def evaluate(self, mine, theirs):
+        """lines still open to only one player, weighted by how many of their marks are already on them"""
+        score = 0
+        for mask in self.masks:
+            if mask & theirs == 0:
+                score += 4 ** popcount(mask & mine)
+            if mask & mine == 0:
+                score -= 4 ** popcount(mask & theirs)
+        return score
+
+    def negamax(self, mine, theirs, depth, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        occupied = mine | theirs
+        if occupied == self.full:
+            return 0
+        empties = self.num_cells - popcount(occupied)
+        if depth == 0:
+            return self.evaluate(mine, theirs)
+
+        alpha_orig = alpha
+        key, symmetry = self.canonical(mine, theirs)
+        first_move = None
+        if (entry := self.table.get(key)) is not None:
+            entry_depth, value, flag, canonical_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                elif flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+            first_move = self.inverses[symmetry][canonical_move]
+
+        best_value, best_move = -SOLVED, None
+        moves = [cell for cell in self.move_order if not occupied >> cell & 1]
+        if first_move is not None:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        for cell in moves:
+            new_mine = mine | (1 << cell)
+            if self.wins(new_mine, cell):
+                value = WIN + empties - 1
+            else:
+                value = -self.negamax(theirs, new_mine, depth - 1, -beta, -alpha)
+            if value > best_value:
+                best_value, best_move = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        flag = UPPER if best_value <= alpha_orig else LOWER if best_value >= beta else EXACT
+        # a search reaching the end of the game holds at any depth
+        self.table[key] = (SOLVED if depth >= empties else depth, best_value, flag, self.images[symmetry][best_move])
+        return best_value
+
+    def search(self, mine, theirs, time_budget=1.0, max_depth=None):
+        """
+        iterative deepening from the position where the player owning mine is to move,
+        returns (value, best cell) from the deepest search that finished within the time budget,
+        (0, None) on a full board
+        """
+        self.deadline = time.perf_counter() + time_budget
+        self.nodes = 0
+        occupied = mine | theirs
+        empties = self.num_cells - popcount(occupied)
+        max_depth = empties if max_depth is None else min(max_depth, empties)
+        if empties == 0:
+            return 0, None
+        # out of time before finishing depth 1: no value yet, play the first legal move in move order
+        value, best_cell = 0, next(cell for cell in self.move_order if not occupied >> cell & 1)
+        for depth in range(1, max_depth + 1):
+            try:
+                value = self.negamax(mine, theirs, depth, -SOLVED, SOLVED)
+            except SearchTimeout:
+                break
+            key, symmetry = self.canonical(mine, theirs)
+            best_cell = self.inverses[symmetry][self.table[key][3]]
+            if abs(value) >= WIN:
+                break
+        return value, best_cell
+
+SEARCHES = {}
+
+def get_search(width, in_a_row=None):
+    """one search (and transposition table) per board shape, kept across moves and games"""
+    in_a_row = width if in_a_row is None else in_a_row
+    if (width, in_a_row) not in SEARCHES:
+        SEARCHES[(width, in_a_row)] = AlphaBetaSearch(width, in_a_row)
+    return SEARCHES[(width, in_a_row)]
+
 class Subgame:
-    def __init__(self, board, num_players, my_number, node_prob, node_player, node_move=None) -> None:
+    """
+    a node of the game tree, after node_player played node_move; children are only built when asked for,
+    and the payoff (from my_number's point of view) is only searched for when asked for:
+    1 or -1 for a forced win or loss, 0 for a tie, and a heuristic in between when the search ran out of time
+    """
+    def __init__(self, board, num_players, my_number, node_prob, node_player, node_move=None, in_a_row=None, time_budget=1.0) -> None:
         self.board = board
         self.width = board.shape[0]
         self.num_players = num_players
@@ -10,9 +189,34 @@ class Subgame:
         self.node_prob = node_prob
         self.node_player = node_player
         self.node_move = node_move
+        self.time_budget = time_budget
 
-        self.children = self.spawn_children()
-        self.payoff = self.calculate_payoff()
+        self.search = get_search(self.width, in_a_row)
+        self.next_player = (node_player + 1) % num_players
+        self.mine = to_bitboard(board, self.next_player)
+        self.theirs = to_bitboard(board, node_player)
+        self.__children = None
+        self.__payoff = None
+
+    @property
+    def children(self):
+        if self.__children is None:
+            self.__children = self.spawn_children()
+        return self.__children
+
+    @property
+    def payoff(self):
+        if self.__payoff is None:
+            if self.has_tictactoe():
+                value = 1
+            elif (self.mine | self.theirs) == self.search.full:
+                value = 0
+            else:
+                value, _ = self.search.search(self.mine, self.theirs, self.time_budget)
+                value = np.sign(value) if abs(value) >= WIN else value / WIN
+                value = -value if value != 0 else 0
+            self.__payoff = value if self.node_player == self.my_number else -value
+        return self.__payoff
 
     def add_move_to_board(self, move, player):
         board = self.board.copy()
@@ -23,96 +227,45 @@ class Subgame:
         """given the current board state, returns a list of Subgames for each possible move the given player could make"""
         rows, cols = (self.board < 0).nonzero()
         moves = [(row,col) for row,col in zip(rows,cols)]
-        next_player = (self.node_player + 1) % self.num_players
-        boards = [self.add_move_to_board(move=move, player=next_player) for move in moves]
-        return [Subgame(board, self.num_players, self.my_number, 1, next_player, node_move=move) for board, move in zip(boards, moves)]
+        boards = [self.add_move_to_board(move=move, player=self.next_player) for move in moves]
+        return [Subgame(board, self.num_players, self.my_number, 1, self.next_player, node_move=move, in_a_row=self.search.in_a_row, time_budget=self.time_budget) for board, move in zip(boards, moves)]
 
     def has_tictactoe(self):
-        player_board = self.board == self.node_player
-        # checking rows & columns
-        for i in range(self.width):
-            if player_board[i,:].all():
-                return True
-            if player_board[:,i].all():
-                return True
-        # checking diagonals
-        if player_board.diagonal().all():
-            return True
-        if np.fliplr(player_board).diagonal().all():
-            return True
-        return False
+        return any(self.theirs & mask == mask for mask in self.search.masks)
 
     def is_terminal_node(self):
-        # are enough squares filled?
-        if (self.board >= 0).sum() < self.width:
-            return False
-        # are all squares filled?
-        elif (self.board >= 0).all():
-            return True
-        return self.has_tictactoe()
-
-    def calculate_terminal_payoff(self):
-        """
-        if game terminates after player's action, then either player has tic-tac-toe or board is full:
-        - if player has tic-tac-toe, then node_player_won = 1, and the payoff is 1 if node_player == my_number and -1 otherwise
-        - if player does not have tic-tac-toe, then board is full; since the board is full and there is no tic-tac-toe, it is a tie and payoff is 0
-        """
-        node_player_won = self.has_tictactoe()
-        payoff = (2 * (self.node_player == self.my_number) - 1) * node_player_won
-        return payoff
+        return (self.mine | self.theirs) == self.search.full or self.has_tictactoe()
 
     def spawn_children(self):
         if self.is_terminal_node():
-            self.payoff = self.calculate_terminal_payoff()
             return []
         return self.generate_node_moves()
 
-    def calculate_payoff(self):
-        """
-        calculates payoff based on two types of nodes:
-        1. we have complete control
-        2. opponent has complete control
-        (3. chance node - not relevant in this case, but is for poker!)
-        """
-        if len(self.children) == 0:
-            return self.payoff
-
-        # we are playing this node, so can always choose best option
-        if self.children[0].node_player == self.my_number:
-            payoff = max([child.payoff for child in self.children])
-        # opponent is playing this node, so we assume the worst option is chosen
-        else:
-            payoff = min([child.payoff for child in self.children])
-            # sum([child.payoff * child.node_prob for child in self.children]) / sum([child.node_prob for child in self.children])
-        return payoff
-
     def get_best_move(self):
-        best_move = None
-        best_payoff = -2
-        for child in self.children:
-            if child.payoff > best_payoff:
-                best_payoff = child.payoff
-                best_move = child.node_move
-        return best_move
+        """the best move for the player to move next (assumed to be my_number) found within the time budget"""
+        _, cell = self.search.search(self.mine, self.theirs, self.time_budget)
+        return divmod(cell, self.width)
 
     def display_board(self):
         print("Board ({:.3f}) - Player {}".format(self.payoff, self.node_player))
         print(self.board)
-    
+
     def display_children(self):
         for child in self.children:
             child.display_board()
 
 class CFRPlayer(Player):
-    def __init__(self) -> None:
+    def __init__(self, time_budget=1.0) -> None:
         super().__init__()
+        self.time_budget = time_budget
 
     def get_move(self, game_state):
         if game_state.turns_played == 0:
             valid_moves = self.get_valid_moves(game_state)
-            return (1, 1) if (1, 1) in valid_moves else (0, 0)
+            center = game_state.board.shape[0] // 2
+            return (center, center) if (center, center) in valid_moves else (0, 0)
 
         num_players = game_state.num_players
         prev_player = (self.my_number - 1) % num_players
-        subgame = Subgame(game_state.board, num_players, self.my_number, 1, prev_player)
+        subgame = Subgame(game_state.board, num_players, self.my_number, 1, prev_player, in_a_row=game_state.in_a_row, time_budget=self.time_budget)
         return subgame.get_best_move()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from utils import GameState
+from utils import GameState, BatchGameState
 import numpy as np
 
 class Player(ABC):
@@ -18,6 +18,10 @@ class Player(ABC):
     def get_move(self, game_state: GameState) -> tuple:
         pass
 
+    def get_moves(self, batch_state: BatchGameState) -> np.ndarray:
+        """(num_games, 2) array of moves for many boards at once, vectorized players override this"""
+        return np.array([self.get_move(game_state) for game_state in batch_state.game_states()], dtype=int).reshape(-1, 2)
+
 class BasicPlayer(Player):
     def __init__(self) -> None:
         super().__init__()
@@ -33,7 +37,19 @@ class BasicPlayer(Player):
         valid_moves = self.get_valid_moves(game_state)
         return valid_moves[0]
 
+    def get_moves(self, batch_state: BatchGameState):
+        boards = batch_state.boards
+        cells = (boards < 0).reshape(len(boards), -1).argmax(axis=1)
+        return np.stack(np.divmod(cells, boards.shape[1]), axis=1)
+
 class RandomPlayer(Player):
     def get_move(self, game_state: GameState):
         valid_moves = self.get_valid_moves(game_state)
-        return valid_moves[np.random.choice(len(valid_moves))]
\ No newline at end of file
+        return valid_moves[np.random.choice(len(valid_moves))]
+
+    def get_moves(self, batch_state: BatchGameState):
+        # a uniformly random empty cell per board: the largest of random scores over the empty cells
+        boards = batch_state.boards
+        scores = np.random.random(boards.shape).reshape(len(boards), -1)
+        scores[(boards >= 0).reshape(len(boards), -1)] = -1
+        return np.stack(np.divmod(scores.argmax(axis=1), boards.shape[1]), axis=1)
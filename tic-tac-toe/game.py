@@ -1,5 +1,5 @@
 import numpy as np
-from utils import TicTacToe, Config
+from utils import TicTacToe, BatchTicTacToe, Config
 from demo_players import BasicPlayer, RandomPlayer
 from CFR_player import CFRPlayer
 
@@ -8,7 +8,7 @@ def run_game(config, verbose=True):
         raise RuntimeError("need exactly 2 players, have {:d}".format(config.num_players))
 
     players = config.get_players()
-    Game = TicTacToe(width=config.width, num_players=config.num_players)
+    Game = TicTacToe(width=config.width, num_players=config.num_players, in_a_row=config.in_a_row)
 
     player = -1
     while not Game.is_game_over(player):
@@ -28,6 +28,28 @@ def run_game(config, verbose=True):
             print("It's a tie!")
         return "tie"
 
+def run_games(config, num_games):
+    """
+    plays num_games games at once on a BatchTicTacToe, every player moving on all unfinished boards in one call;
+    returns an array of the winners' names (or "tie") like repeated calls to run_game
+    """
+    if config.num_players != 2:
+        raise RuntimeError("need exactly 2 players, have {:d}".format(config.num_players))
+
+    players = config.get_players()
+    Games = BatchTicTacToe(num_games, width=config.width, num_players=config.num_players, in_a_row=config.in_a_row)
+
+    player = -1
+    while not Games.done.all():
+        player = (player + 1) % config.num_players
+        games = np.flatnonzero(~Games.done)
+        moves = players[player].get_moves(Games.get_game_state(games))
+        Games.add_moves(games, moves, player)
+        Games.update_done(games, player)
+
+    names = np.array(config.names + ["tie"])
+    return names[Games.winners]
+
 if __name__ == '__main__':
     config = Config(width=3)
     config.register_player("Random Player", RandomPlayer())
@@ -35,12 +57,10 @@ if __name__ == '__main__':
     config.register_player("CFR Player", CFRPlayer())
 
     num_runs = int(1e3)
-    game_results = np.empty(num_runs, dtype="S13")
-    for run in range(num_runs):
-        game_results[run] = run_game(config, verbose=False)
-    
+    game_results = run_games(config, num_runs)
+
     players, counts = np.unique(game_results, return_counts=True)
     for player, count in zip(players, counts):
-        print("{}: {:d}/{:d} ({:.3f})".format(player.decode('utf-8'), count, num_runs, count/num_runs))
+        print("{}: {:d}/{:d} ({:.3f})".format(player, count, num_runs, count/num_runs))
 
         
\ No newline at end of file
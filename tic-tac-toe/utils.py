@@ -1,14 +1,45 @@
 import numpy as np
 
+def win_masks(width, in_a_row):
+    """bitboard masks (cell (row, col) is bit row*width + col) of every line of in_a_row cells on a width x width board"""
+    masks = []
+    for row in range(width):
+        for col in range(width):
+            for d_row, d_col in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                end_row, end_col = row + (in_a_row-1) * d_row, col + (in_a_row-1) * d_col
+                if 0 <= end_row < width and 0 <= end_col < width:
+                    masks.append(sum(1 << ((row + i*d_row) * width + col + i*d_col) for i in range(in_a_row)))
+    return masks
+
+def to_bitboard(board, player):
+    bits = 0
+    for cell in np.flatnonzero(board.flatten() == player):
+        bits |= 1 << int(cell)
+    return bits
+
 class GameState:
-    def __init__(self, board, num_players, turns_played):
+    def __init__(self, board, num_players, turns_played, in_a_row=None):
         self.board = board
         self.num_players = num_players
         self.turns_played = turns_played
+        self.in_a_row = board.shape[0] if in_a_row is None else in_a_row
+
+class BatchGameState:
+    """GameState for many boards at once, boards is a (num_games, width, width) array"""
+    def __init__(self, boards, num_players, turns_played, in_a_row):
+        self.boards = boards
+        self.num_players = num_players
+        self.turns_played = turns_played
+        self.in_a_row = in_a_row
+
+    def game_states(self):
+        return [GameState(board, self.num_players, self.turns_played, self.in_a_row) for board in self.boards]
 
 class Config:
-    def __init__(self, width):
+    def __init__(self, width, in_a_row=None):
+        """in_a_row - marks in a row needed to win, defaults to the width of the board"""
         self.width = width
+        self.in_a_row = width if in_a_row is None else in_a_row
         self.num_players = 0
         self.players = []
         self.names = []
@@ -23,8 +54,10 @@ class Config:
         return self.players
 
 class TicTacToe:
-    def __init__(self, width, num_players):
+    def __init__(self, width, num_players, in_a_row=None):
         self.width = width
+        self.in_a_row = width if in_a_row is None else in_a_row
+        self.win_masks = win_masks(width, self.in_a_row)
         self.board = -np.ones((width, width))
         self.num_players = num_players
         self.moves_played = 0
@@ -45,28 +78,57 @@ class TicTacToe:
         self.moves_played += 1
     
     def has_tictactoe(self, player):
-        player_board = self.board == player
-        # checking rows & columns
-        for i in range(self.width):
-            if player_board[i,:].sum() == self.width:
-                return True
-            if player_board[:,i].sum() == self.width:
-                return True
-        # checking diagonals
-        if player_board.diagonal().sum() == self.width:
-            return True
-        if np.fliplr(player_board).diagonal().all():
-            return True
-        return False
+        player_bits = to_bitboard(self.board, player)
+        return any(player_bits & mask == mask for mask in self.win_masks)
 
     def is_game_over(self, player):
         # are all squares filled?
         if (self.board >= 0).all():
             return True
         # are enough squares filled?
-        elif (self.board >= 0).sum() < self.width:
+        elif (self.board >= 0).sum() < self.in_a_row:
             return False
         return self.has_tictactoe(player)
 
     def get_game_state(self):
-        return GameState(self.board, self.num_players, self.moves_played // 2)
\ No newline at end of file
+        return GameState(self.board, self.num_players, self.moves_played // 2, self.in_a_row)
+
+class BatchTicTacToe:
+    """
+    num_games games played in lockstep, boards held in one (num_games, width, width) array;
+    wins are checked for every board at once against precomputed line masks
+    """
+    def __init__(self, num_games, width, num_players, in_a_row=None):
+        self.width = width
+        self.in_a_row = width if in_a_row is None else in_a_row
+        self.num_players = num_players
+        self.boards = -np.ones((num_games, width, width), dtype=np.int8)
+        # line_masks[cell, line] is 1 if the cell is on the line
+        self.line_masks = np.array([[mask >> cell & 1 for mask in win_masks(width, self.in_a_row)] for cell in range(width * width)], dtype=np.int16)
+        self.moves_played = 0
+        self.winners = -np.ones(num_games, dtype=int)
+        self.done = np.zeros(num_games, dtype=bool)
+
+    def add_moves(self, games, moves, player):
+        """
+        games - indices of the boards to move on, moves - (len(games), 2) array of (row, col);
+        every game still going moves once per call, so a single counter covers them all
+        """
+        rows, cols = moves[:, 0], moves[:, 1]
+        if not ((0 <= rows) & (rows < self.width) & (0 <= cols) & (cols < self.width)).all():
+            raise ValueError("Player {}: move tuple is out of bounds".format(player))
+        if (self.boards[games, rows, cols] >= 0).any():
+            raise ValueError("Player {}: invalid move, square is already filled".format(player))
+        self.boards[games, rows, cols] = player
+        self.moves_played += 1
+
+    def update_done(self, games, player):
+        """marks which of the given games are over now that player has moved on them"""
+        player_boards = (self.boards[games] == player).reshape(len(games), -1).astype(np.int16)
+        won = ((player_boards @ self.line_masks) == self.in_a_row).any(axis=1)
+        full = (self.boards[games] >= 0).reshape(len(games), -1).all(axis=1)
+        self.winners[games[won]] = player
+        self.done[games[won | full]] = True
+
+    def get_game_state(self, games):
+        return BatchGameState(self.boards[games], self.num_players, self.moves_played // 2, self.in_a_row)
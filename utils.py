@@ -103,12 +103,13 @@ class Hand:
         return 0, None, faces_sorted
 
 class HandState:
-    def __init__(self, active, bets, pot, shares, betting_round):
+    def __init__(self, active, bets, pot, shares, betting_round, chip_stacks=None):
         self.active = active
         self.bets = bets
         self.pot = pot
         self.shares = shares
         self.betting_round = betting_round
+        self.chip_stacks = chip_stacks
         self.seat = None
 
     def add_player_seat(self, seat):
@@ -121,14 +122,26 @@ def parse_argv():
 
     players = parser.add_argument_group("players")
     game_config = parser.add_argument_group("game")
+    stopping = parser.add_argument_group("early stopping")
     debug = parser.add_argument_group("debug")
 
     players.add_argument("--fpath", type=str, nargs='?', default='.')
+    players.add_argument("--round_robin", action="store_true")
+    players.add_argument("--processes", type=int, nargs='?', default=None)
 
     game_config.add_argument("--buy_in", type=int, nargs='?', default=200)
     game_config.add_argument("--little_blind", type=int, nargs='?', default=1)
     game_config.add_argument("--big_blind", type=int, nargs='?', default=2)
     game_config.add_argument("--hands", type=int, nargs='?', default=100)
+    game_config.add_argument("--seed", type=int, nargs='?', default=None)
+    game_config.add_argument("--duplicate", action="store_true")
+    game_config.add_argument("--duplicate_mode", type=str, choices=["seats", "cards"], default="seats")
+    game_config.add_argument("--permutations", type=str, choices=["rotations", "all"], default="rotations")
+    game_config.add_argument("--all_in_ev", action="store_true")
+
+    stopping.add_argument("--early_stop", action="store_true")
+    stopping.add_argument("--ci_width", type=float, nargs='?', default=None)
+    stopping.add_argument("--min_hands", type=int, nargs='?', default=100)
 
     debug.add_argument("--verbose", action="store_true")
     debug.add_argument("--outfile", type=str, default=None)
@@ -138,12 +151,9 @@ def parse_argv():
 
 import sys
 def load_player_from_path(dir, name, buy_in):
-    """
-    from https://appdividend.com/2021/03/31/how-to-import-class-from-another-file-in-python/
-    """
-    sys.path.append(dir)
-    exec("from {} import MyPlayer".format(name.removesuffix(".py")))
-    return MyPlayer(buy_in)
+    """creates the MyPlayer bot defined in dir/name (e.g. player_foo.py), importing it at most once per process"""
+    from registry import get_registry
+    return get_registry(dir).create(name.removesuffix(".py").removeprefix("player_"), buy_in)
 
 
 import contextlib
@@ -161,4 +171,187 @@ def smart_open(filename=None):
         yield fh
     finally:
         if fh is not sys.stdout:
-            fh.close()
\ No newline at end of file
+            fh.close()
+
+FACES = {str(num+1): num for num in range(1, 9)}
+FACES.update({'A': 0, 't': 9, 'J': 10, 'Q': 11, 'K': 12})
+SUITS = {'H': 0, 'D': 1, 'S': 2, 'C': 3}
+FACE_NAMES = {num: name for name, num in FACES.items()}
+SUIT_NAMES = {num: name for name, num in SUITS.items()}
+
+def card_to_int(card):
+    """maps a card name like 'tD' onto the dealer's 0-51 numbering (face + 13 * suit)"""
+    return FACES[card[0]] + 13 * SUITS[card[1]]
+
+def int_to_card(card):
+    return FACE_NAMES[card % 13] + SUIT_NAMES[card // 13]
+
+def all_combos():
+    """all 1326 two-card hole card combos as an (n, 2) int array, lower card first"""
+    first, second = np.triu_indices(52, k=1)
+    return np.stack([first, second], axis=1)
+
+def card_rank(card):
+    """rank of a 0-51 card for comparisons: 0 is a deuce, 12 is an ace"""
+    face = card % 13
+    return 12 if face == 0 else face - 1
+
+def straight_high(rank_mask):
+    """highest rank topping a straight in a 13-bit rank mask (3 for the wheel), or -1"""
+    # bit 0 is the ace played low, bit r+1 is rank r
+    mask = (rank_mask << 1) | ((rank_mask >> 12) & 1)
+    for high in range(13, 3, -1):
+        if (mask >> (high - 4)) & 0x1F == 0x1F:
+            return high - 1
+    return -1
+
+def top_ranks(rank_mask, num):
+    ranks = []
+    for rank in range(12, -1, -1):
+        if len(ranks) == num:
+            break
+        if rank_mask >> rank & 1:
+            ranks.append(rank)
+    return ranks
+
+def encode_strength(hand_type, ranks):
+    """packs a hand type (as in Hand.hand_type) and up to five tie-breaking ranks into one comparable int"""
+    strength = hand_type
+    for i in range(5):
+        strength = (strength << 4) | (ranks[i] if i < len(ranks) else 0)
+    return strength
+
+def strength_from_counts(rank_counts, suit_masks):
+    """
+    strength of the best five-card hand given per-rank counts and per-suit rank masks;
+    a larger value is a better hand and equal values split the pot
+    """
+    rank_mask = 0
+    for rank, count in enumerate(rank_counts):
+        if count:
+            rank_mask |= 1 << rank
+
+    flush_mask = 0
+    for suit_mask in suit_masks:
+        if bin(suit_mask).count('1') >= 5:
+            flush_mask = suit_mask
+    if flush_mask and (high := straight_high(flush_mask)) >= 0:
+        return encode_strength(8, [high])
+
+    quads, sets, pairs = [], [], []
+    for rank in range(12, -1, -1):
+        if rank_counts[rank] == 4:
+            quads.append(rank)
+        elif rank_counts[rank] == 3:
+            sets.append(rank)
+        elif rank_counts[rank] == 2:
+            pairs.append(rank)
+
+    if quads:
+        return encode_strength(7, [quads[0]] + top_ranks(rank_mask & ~(1 << quads[0]), 1))
+    if sets and (len(sets) > 1 or pairs):
+        pair = max(sets[1:] + pairs)
+        return encode_strength(6, [sets[0], pair])
+    if flush_mask:
+        return encode_strength(5, top_ranks(flush_mask, 5))
+    if (high := straight_high(rank_mask)) >= 0:
+        return encode_strength(4, [high])
+    if sets:
+        return encode_strength(3, [sets[0]] + top_ranks(rank_mask & ~(1 << sets[0]), 2))
+    if len(pairs) >= 2:
+        kicker = top_ranks(rank_mask & ~(1 << pairs[0]) & ~(1 << pairs[1]), 1)
+        return encode_strength(2, pairs[:2] + kicker)
+    if pairs:
+        return encode_strength(1, [pairs[0]] + top_ranks(rank_mask & ~(1 << pairs[0]), 3))
+    return encode_strength(0, top_ranks(rank_mask, 5))
+
+def hand_strength(cards):
+    """strength of the best five-card hand out of 5-7 cards given as 0-51 ints"""
+    rank_counts = [0] * 13
+    suit_masks = [0] * 4
+    for card in cards:
+        rank = card_rank(card)
+        rank_counts[rank] += 1
+        suit_masks[card // 13] |= 1 << rank
+    return strength_from_counts(rank_counts, suit_masks)
+
+class HandEvaluator:
+    """
+    incrementally evaluated hand: seeded with hole cards, then fed board cards street by street;
+    rank counts, suit counts and rank masks are updated in O(1) per card so strength and draws are cheap to ask for
+    """
+    def __init__(self, hole_cards):
+        self.rank_counts = [0] * 13
+        self.suit_counts = [0] * 4
+        self.suit_masks = [0] * 4
+        self.rank_mask = 0
+        self.cards = []
+        self.num_board_cards = 0
+        self.__strength = None
+        for card in hole_cards:
+            self.add(card_to_int(card))
+
+    def add(self, card):
+        rank = card_rank(card)
+        suit = card // 13
+        self.rank_counts[rank] += 1
+        self.suit_counts[suit] += 1
+        self.suit_masks[suit] |= 1 << rank
+        self.rank_mask |= 1 << rank
+        self.cards.append(card)
+        self.__strength = None
+
+    def remove(self, card):
+        """undoes add for the most recently added card"""
+        rank = card_rank(card)
+        suit = card // 13
+        self.rank_counts[rank] -= 1
+        self.suit_counts[suit] -= 1
+        self.suit_masks[suit] &= ~(1 << rank)
+        if self.rank_counts[rank] == 0:
+            self.rank_mask &= ~(1 << rank)
+        self.cards.pop()
+        self.__strength = None
+
+    def add_board_cards(self, cards):
+        for card in cards:
+            self.add(card_to_int(card))
+            self.num_board_cards += 1
+
+    def strength(self):
+        """comparable strength of the best five cards so far (see strength_from_counts), needs at least 5 cards"""
+        if self.__strength is None:
+            self.__strength = strength_from_counts(self.rank_counts, self.suit_masks)
+        return self.__strength
+
+    def hand_type(self):
+        """hand type as in Hand.hand_type (royal flushes count as straight flushes)"""
+        return self.strength() >> 20
+
+    def flush_draw(self):
+        """suit with exactly four cards so far, or -1"""
+        for suit, count in enumerate(self.suit_counts):
+            if count == 4:
+                return suit
+        return -1
+
+    def straight_draw(self):
+        """ranks that would complete a straight we don't already have (two ranks is open-ended, one a gutshot)"""
+        if straight_high(self.rank_mask) >= 0:
+            return []
+        return [rank for rank in range(13) if not self.rank_mask >> rank & 1 and straight_high(self.rank_mask | 1 << rank) >= 0]
+
+    def outs(self):
+        """unseen cards that would improve our hand type, cards seen by other players are not known here"""
+        if len(self.cards) < 5:
+            raise ValueError("need at least 5 cards to count outs, have {}".format(len(self.cards)))
+        hand_type = self.hand_type()
+        outs = []
+        for card in range(52):
+            if card in self.cards:
+                continue
+            self.add(card)
+            if self.hand_type() > hand_type:
+                outs.append(card)
+            self.remove(card)
+        return outs